@@ -0,0 +1,460 @@
+import argparse
+import random
+import time
+
+from game import GameState
+from ghost import SHORTEST_PATH_ALGORITHMS
+
+# Pac-Man's choices, in the order they are tried without a table hint
+MOVES = [(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)]
+PELLET = 10
+POWER_PELLET = 50
+GHOST = 200
+DEATH = -1000
+WIN = 1000
+# Leaf evaluation: cost per step to the nearest pellet (as it was at the
+# root), and for a non-scared ghost within DANGER steps, per step closer
+PELLET_STEP = 1.0
+DANGER = 3
+DANGER_STEP = 40.0
+# Ghosts and autopilot are both deterministic, so a game can fall into a
+# cycle that never reaches the last pellets. Once the root repeats, leaves
+# pay this much per earlier visit of Pac-Man to their cell.
+REVISIT_STEP = 2.0
+CHECK_EVERY = 128
+# Chase fields (one BFS from each Pac-Man cell) are cached up to this many
+# cells in total, then the cache starts over
+FIELD_CACHE_CELLS = 1 << 22
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class Autopilot:
+    # Picks Pac-Man's move by an expectimax search over game ticks, with
+    # iterative deepening under a per-call time budget: the move of the
+    # deepest search that finished in time is played. The search runs a
+    # compact model of GameState.step: pellets and power pellets, the
+    # power timer, ghosts moving every ghost_interval ticks, eating scared
+    # ghosts and getting caught. The ghosts are predicted the way
+    # Ghost.handle_ai_move moves them: chasers along the maze's distance
+    # table or, without one, downhill in a BFS field from Pac-Man with the
+    # tie-breaks of GridSearch; Clyde greedily; scared ghosts away from
+    # Pac-Man without turning back. A ghost left with no path moves at
+    # random, and that move is a chance node over its possible steps.
+    #
+    # Positions, previous ghost cells, pellets eaten in the search, the
+    # power timer and the ghost phase are Zobrist-hashed into a
+    # transposition table of (depth, value, move). Values are the points
+    # still to come, so they do not depend on how a position was reached,
+    # and the table is kept across calls until a pellet is eaten for real.
+    def __init__(self, budget_ms=5.0, max_depth=64, table_size=1 << 18,
+                 seed=0):
+        self.budget = budget_ms / 1000
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.seed = seed
+        self.table = {}
+        self._grid = None
+        self._remaining = None
+        self.last_depth = 0
+        self.last_nodes = 0
+        self.nodes = 0
+        self.seconds = 0.0
+        self.moves = 0
+        self.depths = 0
+
+    def __call__(self, state, rng=None):
+        # Same signature as the batch.py policies
+        return self.choose(state)
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def mean_depth(self):
+        return self.depths / self.moves if self.moves else 0.0
+
+    def report(self):
+        return (f"autopilot: depth {self.last_depth} (mean "
+                f"{self.mean_depth:.1f}), {self.last_nodes} nodes last "
+                f"move, {self.nodes_per_second:,.0f} nodes/s")
+
+    def _prepare(self, state):
+        maze = state.maze
+        grid = maze.grid
+        self._grid = grid
+        self._remaining = None
+        self.rows = maze.rows
+        cols = self.cols = maze.cols
+        size = maze.rows * cols
+        self.masks, self.steps = grid.neighbor_steps()
+        self.open = [not cell for cell in grid.cells]
+        # The ghosts only use the table when the game has one
+        table = self.distances = maze.distances
+        if table is not None:
+            self.cell_of = [y * cols + x for x, y in table.cells]
+        self.fields = {}
+        rng = random.Random(self.seed)
+
+        def keys(n):
+            return [rng.getrandbits(64) for _ in range(n)]
+        self.pac_keys = keys(size)
+        self.ghost_keys = [keys(size) for _ in state.ghosts]
+        self.prev_keys = [keys(size + 1) for _ in state.ghosts]
+        self.ate_keys = keys(len(state.ghosts))
+        self.eaten_keys = keys(size)
+        self.power_keys = keys(state.power_duration + 3)
+        self.phase_keys = keys(state.ghost_interval)
+
+    def _distance(self, a, b):
+        table = self.distances
+        cols = self.cols
+        if table is not None:
+            n = table.size
+            d = table.dist[table.index[a] * n + table.index[b]]
+            if d != table.UNREACHABLE:
+                return d
+        return abs(a % cols - b % cols) + abs(a // cols - b // cols)
+
+    def _bfs(self, sources, cells):
+        # Steps from every cell to the nearest source; -1 if unreachable
+        dist = [-1] * len(cells)
+        for i in sources:
+            dist[i] = 0
+        masks = self.masks
+        steps = self.steps
+        queue = list(sources)
+        for i in queue:
+            d = dist[i] + 1
+            for step in steps[masks[i]]:
+                j = i + step
+                if dist[j] < 0 and not cells[j]:
+                    dist[j] = d
+                    queue.append(j)
+        return dist
+
+    def _pellet_field(self, maze):
+        bits = bytearray(maze.pellets.bits)
+        for i, bit in enumerate(maze.power_pellets.bits):
+            if bit:
+                bits[i] = 1
+        cells = maze.grid.cells
+        dist = self._bfs([i for i, bit in enumerate(bits) if bit], cells)
+        unreachable = len(cells)
+        return [d if d >= 0 else unreachable for d in dist]
+
+    def _field(self, pac):
+        # Distances to Pac-Man at pac, as PursuitField builds them
+        field = self.fields.get(pac)
+        if field is None:
+            if (len(self.fields) + 1) * len(self.open) > FIELD_CACHE_CELLS:
+                self.fields.clear()
+            field = self.fields[pac] = self._bfs([pac], self._grid.cells)
+        return field
+
+    def choose(self, state):
+        maze = state.maze
+        if maze.grid is not self._grid:
+            self._prepare(state)
+        start = time.perf_counter()
+        self.deadline = start + self.budget
+        cols = self.cols
+        pacman = state.pacman
+        ghosts = state.ghosts
+        self.pellets = maze.pellets.bits
+        self.power_pellets = maze.power_pellets.bits
+        self.remaining = len(maze.pellets) + len(maze.power_pellets)
+        if self.remaining != self._remaining:
+            # Leaf values depend on the pellets left at the root
+            self._remaining = self.remaining
+            self.pellet_dist = self._pellet_field(maze)
+            self.table.clear()
+            self.roots = set()
+            self.visits = {}
+        self.eaten = bytearray(len(self.pellets))
+        self.interval = state.ghost_interval
+        self.duration = state.power_duration
+        self.algorithms = [g.algorithm for g in ghosts]
+        self.spawns = [g.start_y * cols + g.start_x for g in ghosts]
+        pac = pacman.y * cols + pacman.x
+        ghost_cells = [g.y * cols + g.x for g in ghosts]
+        prevs = [g.prev_pos[1] * cols + g.prev_pos[0] if g.prev_pos else -1
+                 for g in ghosts]
+        ate = [g.ate_during_power for g in ghosts]
+        power = (state.tick - pacman.power_time if pacman.powered_up
+                 else -1)
+        self.eaten_hash = 0
+        root = self._hash(pac, ghost_cells, prevs, ate, power, state.tick)
+        if root in self.roots:
+            # A cycle: values in the table did not count the visits
+            self.table.clear()
+            self.roots.clear()
+        self.roots.add(root)
+        self.visits[pac] = self.visits.get(pac, 0) + 1
+        self.node_count = 0
+        best = (0, 0)
+        try:
+            for depth in range(1, self.max_depth + 1):
+                self.eaten_hash = 0
+                _, move = self._value(pac, ghost_cells, prevs, ate, power,
+                                      state.tick, depth)
+                if move is not None:
+                    best = MOVES[move]
+                self.last_depth = depth
+                if len(self.table) > self.table_size:
+                    self.table.clear()
+        except _OutOfTime:
+            pass
+        elapsed = time.perf_counter() - start
+        self.last_nodes = self.node_count
+        self.nodes += self.node_count
+        self.seconds += elapsed
+        self.moves += 1
+        self.depths += self.last_depth
+        return best
+
+    def _hash(self, pac, ghost_cells, prevs, ate, power, tick):
+        h = self.pac_keys[pac] ^ self.phase_keys[tick % self.interval]
+        h ^= self.power_keys[min(power, self.duration + 1) + 1]
+        for k, cell in enumerate(ghost_cells):
+            h ^= self.ghost_keys[k][cell] ^ self.prev_keys[k][prevs[k] + 1]
+            if ate[k]:
+                h ^= self.ate_keys[k]
+        return h ^ self.eaten_hash
+
+    def _value(self, pac, ghost_cells, prevs, ate, power, tick, depth):
+        # (expected points still to come, best move index) at this node
+        self.node_count += 1
+        if self.node_count % CHECK_EVERY == 0 and (
+                time.perf_counter() > self.deadline):
+            raise _OutOfTime
+        if depth == 0:
+            return self._evaluate(pac, ghost_cells, ate, power), None
+        key = self._hash(pac, ghost_cells, prevs, ate, power, tick)
+        entry = self.table.get(key)
+        hint = None
+        if entry is not None:
+            if entry[0] >= depth:
+                return entry[1], entry[2]
+            hint = entry[2]
+        cols = self.cols
+        order = range(len(MOVES))
+        if hint is not None:
+            order = [hint] + [m for m in order if m != hint]
+        best_value = None
+        best_move = None
+        for m in order:
+            dx, dy = MOVES[m]
+            moved = bool(dx or dy)
+            target = pac + dy * cols + dx
+            if moved and not self.open[target]:
+                continue
+            if not moved and best_move is not None:
+                continue
+            value = self._play(target if moved else pac, ghost_cells, prevs,
+                               ate, power, tick, depth, moved)
+            if best_value is None or value > best_value:
+                best_value = value
+                best_move = m
+        self.table[key] = (depth, best_value, best_move)
+        return best_value, best_move
+
+    def _play(self, pac, ghost_cells, prevs, ate, power, tick, depth, moved):
+        # One tick of GameState.step with Pac-Man now at pac; returns the
+        # points it earns plus the expected value of what follows
+        reward = 0
+        eaten = self.eaten
+        eaten_here = None
+        ate = list(ate)
+        if moved and not eaten[pac] and (self.pellets[pac]
+                                         or self.power_pellets[pac]):
+            eaten[pac] = 1
+            eaten_here = pac
+            self.eaten_hash ^= self.eaten_keys[pac]
+            self.remaining -= 1
+            if self.pellets[pac]:
+                reward += PELLET
+            else:
+                reward += POWER_PELLET
+                power = 0
+                ate = [False] * len(ate)
+        try:
+            if self.remaining == 0:
+                return reward + WIN
+            ghost_cells = list(ghost_cells)
+            prevs = list(prevs)
+            if moved:
+                caught, points = self._collide(pac, ghost_cells, prevs, ate,
+                                               power)
+                reward += points
+                if caught:
+                    return reward + DEATH
+            if power > self.duration:
+                power = -1
+                ate = [False] * len(ate)
+            elif power >= 0:
+                power += 1
+            tick += 1
+            if tick % self.interval:
+                value, _ = self._value(pac, ghost_cells, prevs, ate, power,
+                                       tick, depth - 1)
+                return reward + value
+            expected = 0.0
+            for p, cells, moved_prevs in self._ghost_moves(
+                    pac, ghost_cells, prevs, ate, power):
+                if self._caught(pac, cells, ate, power):
+                    value = DEATH
+                else:
+                    value, _ = self._value(pac, cells, moved_prevs, ate,
+                                           power, tick, depth - 1)
+                expected += p * value
+            return reward + expected
+        finally:
+            if eaten_here is not None:
+                eaten[eaten_here] = 0
+                self.eaten_hash ^= self.eaten_keys[eaten_here]
+                self.remaining += 1
+
+    def _collide(self, pac, ghost_cells, prevs, ate, power):
+        # PacMan.handle_collisions: eats scared ghosts, else is caught
+        points = 0
+        for k, cell in enumerate(ghost_cells):
+            if cell != pac:
+                continue
+            if power >= 0 and not ate[k]:
+                ghost_cells[k] = self.spawns[k]
+                prevs[k] = -1
+                ate[k] = True
+                points += GHOST
+            else:
+                return True, points
+        return False, points
+
+    def _caught(self, pac, ghost_cells, ate, power):
+        # Ghost.check_pacman_caught after the ghosts move
+        for k, cell in enumerate(ghost_cells):
+            if cell == pac and (power < 0 or ate[k]):
+                return True
+        return False
+
+    def _ghost_moves(self, pac, ghost_cells, prevs, ate, power):
+        # Every (probability, ghost cells, previous cells) the ghosts' turn
+        # can end in; usually just one
+        outcomes = [(1.0, ghost_cells, prevs)]
+        for k in range(len(ghost_cells)):
+            options = self._ghost_options(k, pac, ghost_cells[k], prevs[k],
+                                          power >= 0 and not ate[k])
+            if len(options) == 1:
+                _, cell, prev = options[0]
+                for _, cells, prv in outcomes:
+                    cells[k] = cell
+                    prv[k] = prev
+                continue
+            branched = []
+            for p, cells, prv in outcomes:
+                for q, cell, prev in options:
+                    cells2 = list(cells)
+                    prv2 = list(prv)
+                    cells2[k] = cell
+                    prv2[k] = prev
+                    branched.append((p * q, cells2, prv2))
+            outcomes = branched
+        return outcomes
+
+    def _ghost_options(self, k, pac, cell, prev, scared):
+        # [(probability, next cell, next previous cell)] for ghost k
+        cols = self.cols
+        neighbors = [cell + step for step in self.steps[self.masks[cell]]]
+        fresh = [j for j in neighbors if j != prev] or neighbors
+        algorithm = self.algorithms[k]
+        if scared:
+            # Ghost.simple_move_away
+            if not fresh:
+                return [(1.0, cell, prev)]
+            px = pac % cols
+            py = pac // cols
+            best = max((abs(j % cols - px) + abs(j // cols - py),
+                        j % cols, j // cols, j) for j in fresh)
+            return [(1.0, best[3], cell)]
+        if algorithm in SHORTEST_PATH_ALGORITHMS:
+            step = self._chase_step(cell, pac, neighbors,
+                                    by_position=algorithm != "BFS")
+            if step is not None:
+                return [(1.0, step, cell)]
+        elif algorithm == "Greedy" and neighbors:
+            # Ghost.simple_target
+            px = pac % cols
+            py = pac // cols
+            best = min((abs(j % cols - px) + abs(j // cols - py),
+                        j % cols, j // cols, j) for j in neighbors)
+            return [(1.0, best[3], cell)]
+        # No path: Ghost.simple_random_move
+        if not fresh:
+            return [(1.0, cell, prev)]
+        p = 1.0 / len(fresh)
+        return [(p, j, cell) for j in fresh]
+
+    def _chase_step(self, cell, pac, neighbors, by_position):
+        table = self.distances
+        if table is not None:
+            n = table.size
+            slot = table.index[cell] * n + table.index[pac]
+            if table.dist[slot] in (0, table.UNREACHABLE):
+                return None
+            return self.cell_of[table.next_hop[slot]]
+        # PursuitField.path: downhill, smallest (x, y) first or the first
+        # neighbour in search order
+        field = self._field(pac)
+        d = field[cell] - 1
+        if d < 0:
+            return None
+        cols = self.cols
+        rows = self.rows
+        best = None
+        for j in neighbors:
+            if field[j] == d:
+                if not by_position:
+                    return j
+                if best is None or ((j % cols) * rows + j // cols
+                                    < (best % cols) * rows + best // cols):
+                    best = j
+        return best
+
+    def _evaluate(self, pac, ghost_cells, ate, power):
+        value = -PELLET_STEP * self.pellet_dist[pac]
+        value -= REVISIT_STEP * self.visits.get(pac, 0)
+        for k, cell in enumerate(ghost_cells):
+            if power >= 0 and not ate[k]:
+                continue
+            d = self._distance(cell, pac)
+            if d < DANGER:
+                value -= DANGER_STEP * (DANGER - d)
+        return value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play headless games with the autopilot")
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    parser.add_argument("--max-ticks", type=int, default=3000)
+    parser.add_argument("--engine", default="python")
+    parser.add_argument("--distance-table", action="store_true")
+    args = parser.parse_args()
+    for seed in range(args.seed, args.seed + args.games):
+        state = GameState(seed=seed, engine=args.engine,
+                          distance_table=args.distance_table)
+        pilot = Autopilot(budget_ms=args.budget_ms, seed=seed)
+        while not state.done and state.tick < args.max_ticks:
+            state.step(*pilot.choose(state))
+        print(f"seed {seed}: {state.status if state.done else 'timeout'} "
+              f"after {state.tick} ticks, score {state.pacman.score}, "
+              f"{len(state.maze.pellets)} pellets left; {pilot.report()}")
+
+
+if __name__ == "__main__":
+    main()
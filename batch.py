@@ -0,0 +1,164 @@
+import argparse
+import csv
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from autopilot import Autopilot
+from game import GameState
+from ghost import GHOST_CONFIGS
+
+MOVES = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+START_LIVES = 3
+
+
+def random_policy(state, rng):
+    grid = state.maze.grid
+    x, y = state.pacman.x, state.pacman.y
+    moves = [(dx, dy) for dx, dy in MOVES if grid.is_open(x + dx, y + dy)]
+    return rng.choice(moves) if moves else (0, 0)
+
+
+def pellet_policy(state, rng):
+    # Walk towards the nearest remaining pellet; wander if none is reachable
+    maze = state.maze
+    grid = maze.grid
+    start = (state.pacman.x, state.pacman.y)
+    first = {start: None}
+    queue = deque([start])
+    while queue:
+        pos = queue.popleft()
+        if pos != start and (pos in maze.pellets or pos in maze.power_pellets):
+            dx, dy = first[pos]
+            return dx, dy
+        x, y = pos
+        for dx, dy in MOVES:
+            npos = (x + dx, y + dy)
+            if npos not in first and grid.is_open(x + dx, y + dy):
+                first[npos] = first[pos] or (dx, dy)
+                queue.append(npos)
+    return random_policy(state, rng)
+
+
+POLICIES = {
+    "random": random_policy,
+    "pellet": pellet_policy,
+}
+# Policies that keep state between moves, built once per game
+STATEFUL_POLICIES = {
+    "autopilot": Autopilot,
+}
+
+
+def play_game(seed, policy="random", max_ticks=5000, engine="python"):
+    start = time.perf_counter()
+    state = GameState(seed=seed, engine=engine)
+    if policy in STATEFUL_POLICIES:
+        choose = STATEFUL_POLICIES[policy]()
+    else:
+        choose = POLICIES[policy]
+    rng = random.Random(f"policy:{seed}")
+    catches = {name: 0 for _, name in GHOST_CONFIGS}
+    ghosts_eaten = 0
+    while not state.done and state.tick < max_ticks:
+        for kind, detail in state.step(*choose(state, rng)):
+            if kind == "caught":
+                catches[detail] += 1
+            elif kind == "ghost_eaten":
+                ghosts_eaten += 1
+    return {
+        "seed": seed,
+        "policy": policy,
+        "status": state.status if state.done else "timeout",
+        "score": state.pacman.score,
+        "lives_lost": START_LIVES - state.pacman.lives,
+        "ticks": state.tick,
+        "ghosts_eaten": ghosts_eaten,
+        "catches": catches,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+class ResultWriter:
+    # Appends one record per finished game, flushing after each so partial
+    # batches survive an interrupted run
+    def __init__(self, path):
+        self.path = path
+        self.format = "csv" if path.endswith(".csv") else "jsonl"
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="")
+        self.csv = None
+        if self.format == "csv":
+            fields = ["seed", "policy", "status", "score", "lives_lost",
+                      "ticks", "ghosts_eaten", "seconds"]
+            fields += [f"catches_{name}" for _, name in GHOST_CONFIGS]
+            self.csv = csv.DictWriter(self.file, fieldnames=fields)
+            if new_file:
+                self.csv.writeheader()
+
+    def write(self, result):
+        if self.csv is not None:
+            row = {k: v for k, v in result.items() if k != "catches"}
+            for name, count in result["catches"].items():
+                row[f"catches_{name}"] = count
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(result) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def run_batch(games, seed=0, workers=None, policy="random", max_ticks=5000,
+              engine="python", output="results.jsonl"):
+    workers = workers or os.cpu_count() or 1
+    writer = ResultWriter(output)
+    totals = {name: 0 for _, name in GHOST_CONFIGS}
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(play_game, seed + i, policy, max_ticks, engine)
+                for i in range(games)
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                writer.write(result)
+                for name, count in result["catches"].items():
+                    totals[name] += count
+                elapsed = time.perf_counter() - start
+                print(f"\r{done}/{games} games, "
+                      f"{done / elapsed:.2f} games/s", end="", flush=True)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"\n{games} games in {elapsed:.1f}s with {workers} workers "
+          f"({games / elapsed:.2f} games/s)")
+    for algorithm, name in GHOST_CONFIGS:
+        print(f"  {name:>6} ({algorithm}): {totals[name]} catches")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run many seeded headless games in parallel")
+    parser.add_argument("games", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--policy", choices=sorted([*POLICIES, *STATEFUL_POLICIES]),
+                        default="random")
+    parser.add_argument("--max-ticks", type=int, default=5000)
+    parser.add_argument("--engine", default="python")
+    parser.add_argument("--output", default="results.jsonl",
+                        help="append results here (.jsonl or .csv)")
+    args = parser.parse_args()
+    run_batch(args.games, args.seed, args.workers, args.policy,
+              args.max_ticks, args.engine, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,581 @@
+import argparse
+from collections import deque
+import heapq
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from utils import ROWS, COLS  # noqa: E402
+from maze import Maze, MazeGenerator, DistanceTable, PelletSet, MAX_TABLE_CELLS  # noqa: E402
+from ghost import Ghost, GHOST_CONFIGS  # noqa: E402
+from pacman import PacMan  # noqa: E402
+from grid import Grid  # noqa: E402
+from pathfinding import GridSearch, PursuitField, IncrementalPlanner  # noqa: E402
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_generation(args):
+    baseline = None
+    reference = None
+    runs = [(engine, workers, False)
+            for engine in args.engines for workers in args.workers]
+    if args.incremental:
+        runs.append(("python", 1, True))
+    for engine, workers, incremental in runs:
+        generator = MazeGenerator(ROWS, COLS, engine=engine,
+                                  workers=workers, seed=args.seed,
+                                  cache_size=args.cache_size,
+                                  incremental=incremental)
+        elapsed, grid = timed(generator.generate_maze)
+        if baseline is None:
+            baseline, reference = elapsed, grid
+        same = "same maze" if grid == reference else "DIFFERENT maze"
+        info = generator.cache_info()
+        name = "inc" if incremental else engine
+        print(f"{name:>8} x{workers:<2}: {elapsed:.3f}s  "
+              f"({baseline / elapsed:.1f}x, {same}, "
+              f"cache {info.hits} hits / {info.misses} misses)")
+        if incremental:
+            print(f"          {generator.repaired} repaired, "
+                  f"{generator.full_floods} full floods, "
+                  f"{generator.levels_reused} of "
+                  f"{generator.levels_reused + generator.levels_flooded} "
+                  f"BFS levels reused")
+
+
+def random_walk(maze, ticks, seed):
+    rng = random.Random(seed)
+    x, y = 1, 1
+    trail = []
+    for _ in range(ticks):
+        moves = [(x + dx, y + dy) for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]
+                 if maze.grid.is_open(x + dx, y + dy)]
+        if moves:
+            x, y = rng.choice(moves)
+        trail.append((x, y))
+    return trail
+
+
+def run_ghost_ai(maze, trail, seed, pursuit=None):
+    # Ghosts are scattered to fresh cells reachable from Pac-Man every tick
+    # so each search covers a typical chase distance instead of collapsing
+    # onto Pac-Man
+    random.seed(seed)
+    ghosts = [Ghost(1, 1, None, algorithm, name)
+              for algorithm, name in GHOST_CONFIGS]
+    pacman = PacMan()
+    reachable, _ = maze.grid.flood(1, 1)
+    cols = maze.cols
+    cells = [(i % cols, i // cols) for i, cell in enumerate(reachable) if cell]
+    rng = random.Random(seed)
+    spots = [[rng.choice(cells) for _ in ghosts] for _ in trail]
+    elapsed = 0.0
+    for (x, y), positions in zip(trail, spots):
+        pacman.x, pacman.y = x, y
+        for ghost, (gx, gy) in zip(ghosts, positions):
+            ghost.x, ghost.y = gx, gy
+        start = time.perf_counter()
+        for ghost in ghosts:
+            ghost.handle_ai_move(pacman, maze, ghosts, pursuit)
+        elapsed += time.perf_counter() - start
+    return elapsed / len(trail)
+
+
+def bench_ghost_ai(args):
+    maze = Maze(engine="numpy", seed=args.seed)
+    trail = random_walk(maze, args.ticks, args.seed)
+    maze.distances = None
+    search = run_ghost_ai(maze, trail, args.seed)
+    pursuit = PursuitField(ROWS, COLS)
+    shared = run_ghost_ai(maze, trail, args.seed, pursuit)
+    build, maze.distances = timed(DistanceTable, maze.grid)
+    table = run_ghost_ai(maze, trail, args.seed)
+    print(f"open cells: {maze.distances.size}, "
+          f"table build: {build * 1000:.1f} ms, "
+          f"pursuit field builds: {pursuit.builds}/{len(trail)} ticks")
+    print(f" search: {search * 1e6:8.1f} us/tick")
+    print(f"pursuit: {shared * 1e6:8.1f} us/tick  ({search / shared:.1f}x)")
+    print(f"  table: {table * 1e6:8.1f} us/tick  ({search / table:.1f}x)")
+
+
+# Path-copying searches as they were before pathfinding.GridSearch, kept
+# as the baseline for the search benchmark
+def copying_a_star(grid, sx, sy, tx, ty):
+    goal = (tx, ty)
+    open_set = [(abs(sx - tx) + abs(sy - ty), 0, (sx, sy), [])]
+    closed = set()
+    while open_set:
+        f, g, pos, path = heapq.heappop(open_set)
+        if pos == goal:
+            return path
+        if pos in closed:
+            continue
+        closed.add(pos)
+        x, y = pos
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            nx = x + dx
+            ny = y + dy
+            if grid[ny][nx] == 0 and (nx, ny) not in closed:
+                h = abs(nx - tx) + abs(ny - ty)
+                heapq.heappush(open_set, (g + 1 + h, g + 1, (nx, ny),
+                                          path + [(nx, ny)]))
+    return []
+
+
+def copying_dijkstra(grid, sx, sy, tx, ty):
+    goal = (tx, ty)
+    open_set = [(0, (sx, sy), [])]
+    closed = set()
+    while open_set:
+        g, pos, path = heapq.heappop(open_set)
+        if pos == goal:
+            return path
+        if pos in closed:
+            continue
+        closed.add(pos)
+        x, y = pos
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            nx = x + dx
+            ny = y + dy
+            if grid[ny][nx] == 0 and (nx, ny) not in closed:
+                heapq.heappush(open_set, (g + 1, (nx, ny), path + [(nx, ny)]))
+    return []
+
+
+def copying_bfs(grid, sx, sy, tx, ty):
+    goal = (tx, ty)
+    queue = deque([((sx, sy), [])])
+    visited = {(sx, sy)}
+    while queue:
+        (x, y), path = queue.popleft()
+        if (x, y) == goal:
+            return path
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            nx = x + dx
+            ny = y + dy
+            if grid[ny][nx] == 0 and (nx, ny) not in visited:
+                visited.add((nx, ny))
+                queue.append(((nx, ny), path + [(nx, ny)]))
+    return []
+
+
+def measure_search(search, grid, pairs):
+    elapsed, _ = timed(lambda: [search(grid, *s, *t) for s, t in pairs])
+    tracemalloc.start()
+    for s, t in pairs[:50]:
+        search(grid, *s, *t)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / len(pairs), peak
+
+
+def bench_search(args):
+    grid = MazeGenerator(ROWS, COLS, engine="numpy",
+                         seed=args.seed).generate_maze()
+    cells = [(x, y) for y in range(ROWS) for x in range(COLS)
+             if grid.is_open(x, y)]
+    rows = grid.to_rows()
+    rng = random.Random(args.seed)
+    pairs = [(rng.choice(cells), rng.choice(cells))
+             for _ in range(args.pairs)]
+    core = GridSearch(ROWS, COLS)
+    cases = [
+        ("A*", copying_a_star, core.a_star),
+        ("Dijkstra", copying_dijkstra, core.dijkstra),
+        ("BFS", copying_bfs, core.bfs),
+    ]
+    for name, old, new in cases:
+        old_time, old_peak = measure_search(old, rows, pairs)
+        new_time, new_peak = measure_search(new, grid, pairs)
+        print(f"{name:>8}: {old_time * 1e6:7.1f} -> {new_time * 1e6:7.1f} "
+              f"us/search ({old_time / new_time:.1f}x), peak alloc "
+              f"{old_peak / 1024:7.1f} -> {new_peak / 1024:5.1f} KiB")
+
+
+def eat_all(pellets, route):
+    # PacMan.move's pellet handling: membership test, eat, win check
+    eaten = 0
+    for pos in route:
+        if pos in pellets:
+            pellets.remove(pos)
+            eaten += 1
+        if not pellets:
+            break
+    return eaten
+
+
+def bench_pellets(args):
+    for size in args.sizes:
+        cells = [(x, y) for y in range(1, size - 1) for x in range(1, size - 1)]
+        route = cells[::-1]
+        list_time, eaten = timed(eat_all, list(cells), route)
+        bitmap_time, _ = timed(eat_all, PelletSet(size, size, cells), route)
+        print(f"{size:>4}x{size:<4} {eaten:>7} pellets: list "
+              f"{list_time / eaten * 1e6:9.2f} us/step, bitmap "
+              f"{bitmap_time / eaten * 1e6:6.2f} us/step "
+              f"({list_time / bitmap_time:.0f}x)")
+
+
+def list_spawn_cells(maze):
+    # The old Ghost.create_ghosts: BFS with membership tests against a list
+    # of every open cell, quadratic in the number of open cells
+    all_empty = []
+    for y in range(maze.rows):
+        for x in range(maze.cols):
+            if maze.grid.is_open(x, y):
+                all_empty.append((x, y))
+    reachable = set()
+    queue = deque([(1, 1)])
+    reachable.add((1, 1))
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            nx = x + dx
+            ny = y + dy
+            if (nx, ny) in all_empty and (nx, ny) not in reachable:
+                reachable.add((nx, ny))
+                queue.append((nx, ny))
+    return [(x, y) for x, y in reachable if (x, y) != (1, 1) and any(
+        (x + dx, y + dy) in reachable
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)])]
+
+
+def bench_spawn(args):
+    # Ghost setup on a fresh grid (no cached neighbour masks or components)
+    for size in args.sizes:
+        maze = Maze(engine=args.engine, seed=args.seed, rows=size, cols=size,
+                    generations=1)
+        cells = maze.grid.cells
+        maze.grid = Grid(size, size, cells)
+        new_time, ghosts = timed(Ghost.create_ghosts, maze)
+        maze.grid = Grid(size, size, cells)
+        far_time, _ = timed(Ghost.create_ghosts, maze,
+                            min_distance=args.min_distance)
+        line = (f"{size:>4}x{size:<4} {maze.grid.count_open():>7} open: "
+                f"indexed {new_time * 1000:8.2f} ms, min distance "
+                f"{args.min_distance} {far_time * 1000:8.2f} ms")
+        if size <= args.list_max:
+            maze.grid = Grid(size, size, cells)
+            old_time, spawnable = timed(list_spawn_cells, maze)
+            assert set(spawnable) == set(Ghost.spawn_cells(maze))
+            line += (f", list {old_time * 1000:9.2f} ms "
+                     f"({old_time / new_time:.0f}x)")
+        print(line)
+
+
+def bench_scaling(args):
+    # Generation time and per-tick ghost AI cost as the board grows. The GA
+    # is cut to --generations so the big boards finish in reasonable time.
+    for size in args.sizes:
+        gen_time, maze = timed(Maze, engine=args.engine, seed=args.seed,
+                               rows=size, cols=size,
+                               generations=args.generations)
+        grid_bytes = len(maze.grid.cells)
+        rows = maze.grid.to_rows()
+        list_bytes = sys.getsizeof(rows) + sum(map(sys.getsizeof, rows))
+        reachable = maze.grid.flood(1, 1)[1]
+        trail = random_walk(maze, args.ticks, args.seed)
+        search = run_ghost_ai(maze, trail, args.seed)
+        shared = run_ghost_ai(maze, trail, args.seed,
+                              PursuitField(size, size))
+        line = (f"{size:>4}x{size:<4} generate {gen_time:7.2f}s, grid "
+                f"{grid_bytes / 1024:7.1f} KiB (lists "
+                f"{list_bytes / 1024:8.1f} KiB), {reachable}/"
+                f"{maze.grid.count_open()} cells reachable, search "
+                f"{search * 1000:8.2f} ms/tick, pursuit "
+                f"{shared * 1000:7.2f} ms/tick")
+        if maze.grid.count_open() <= MAX_TABLE_CELLS:
+            maze.distances = DistanceTable(maze.grid)
+            table = run_ghost_ai(maze, trail, args.seed)
+            line += f", table {table * 1000:6.3f} ms/tick"
+        print(line)
+
+
+def chase(maze, planner, steps, ticks, seed):
+    # A ghost following its own path towards a Pac-Man who takes steps
+    # random steps between ghost moves; returns the cells expanded on each
+    # ghost move and the total search time
+    rng = random.Random(seed)
+    grid = maze.grid
+    cells = [(x, y) for y in range(maze.rows) for x in range(maze.cols)
+             if grid.is_open(x, y)]
+    px, py = 1, 1
+    gx, gy = rng.choice(cells)
+    counts = []
+    elapsed = 0.0
+    for _ in range(ticks):
+        for _ in range(steps):
+            moves = [(px + dx, py + dy)
+                     for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]
+                     if grid.is_open(px + dx, py + dy)]
+            if moves:
+                px, py = rng.choice(moves)
+        before = planner.expanded
+        start = time.perf_counter()
+        if isinstance(planner, IncrementalPlanner):
+            path = planner.path(grid, gx, gy, px, py)
+        elif planner.heuristic:
+            path = planner.search.a_star(grid, gx, gy, px, py)
+        else:
+            path = planner.search.dijkstra(grid, gx, gy, px, py)
+        elapsed += time.perf_counter() - start
+        counts.append(planner.expanded - before)
+        if path:
+            gx, gy = path[0]
+        if (gx, gy) == (px, py):
+            # Caught: respawn somewhere else, as after a lost life
+            gx, gy = rng.choice(cells)
+    return counts, elapsed
+
+
+class ScratchSearch:
+    # GridSearch.a_star / dijkstra with the planner's counter interface
+    def __init__(self, rows, cols, heuristic):
+        self.search = GridSearch(rows, cols)
+        self.heuristic = heuristic
+
+    @property
+    def expanded(self):
+        return self.search.expanded
+
+
+def bench_replanning(args):
+    for algorithm, heuristic in [("A*", True), ("Dijkstra", False)]:
+        for steps in args.pacman_steps:
+            totals = {"scratch": [], "incremental": []}
+            seconds = {"scratch": 0.0, "incremental": 0.0}
+            for seed in range(args.seed, args.seed + args.mazes):
+                maze = Maze(engine=args.engine, seed=seed,
+                            rng=random.Random(seed))
+                for name, planner in [
+                        ("scratch", ScratchSearch(maze.rows, maze.cols,
+                                                  heuristic)),
+                        ("incremental", IncrementalPlanner(
+                            maze.rows, maze.cols, heuristic))]:
+                    counts, elapsed = chase(maze, planner, steps,
+                                            args.ticks, seed)
+                    totals[name].extend(counts)
+                    seconds[name] += elapsed
+            line = f"{algorithm:>8}, Pac-Man {steps} step(s)/move:"
+            for name, counts in totals.items():
+                ordered = sorted(counts)
+                line += (f"  {name} {sum(counts) / len(counts):6.1f} "
+                         f"expanded/move (p95 "
+                         f"{ordered[len(ordered) * 95 // 100]:4d}), "
+                         f"{seconds[name] / len(counts) * 1e6:6.1f} us")
+            print(line)
+
+
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import game, maze, ghost, pacman, pathfinding, grid
+print(time.perf_counter() - start)
+"""
+
+FIRST_FRAME_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import utils
+utils.ATLAS_DIR = sys.argv[1]
+from game import GameState
+from renderer import Renderer
+imported = time.perf_counter()
+utils.init_display()
+display = time.perf_counter()
+state = GameState(seed=int(sys.argv[2]), engine=sys.argv[3])
+ready = time.perf_counter()
+Renderer(utils.screen, utils.SPRITES, utils.font).reset(state)
+end = time.perf_counter()
+print(imported - start, display - imported, ready - display, end - ready)
+"""
+
+
+def run_script(script, *argv):
+    # Fresh interpreter per run, so nothing is imported or cached yet
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+               PYGAME_HIDE_SUPPORT_PROMPT="1")
+    out = subprocess.run([sys.executable, "-c", script, *map(str, argv)],
+                         capture_output=True, text=True, check=True, env=env,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    return [float(v) for v in out.stdout.split()]
+
+
+def bench_startup(args):
+    imports = [run_script(IMPORT_SCRIPT)[0] for _ in range(args.runs)]
+    print(f"logic imports: {statistics.median(imports) * 1000:7.1f} ms")
+    with tempfile.TemporaryDirectory() as atlas_dir:
+        # The first run builds the sprite atlas, the others read it back
+        runs = [run_script(FIRST_FRAME_SCRIPT, atlas_dir, args.seed,
+                           args.engine) for _ in range(args.runs + 1)]
+    for name, samples in [("cold atlas", runs[:1]), ("cached atlas", runs[1:])]:
+        parts = [statistics.median(part) * 1000 for part in zip(*samples)]
+        print(f"{name:>12}: first frame {sum(parts):7.1f} ms (imports "
+              f"{parts[0]:.1f}, display + sprites {parts[1]:.1f}, maze "
+              f"{parts[2]:.1f}, draw {parts[3]:.1f})")
+
+
+def bench_ga(args):
+    # Fixed 100-generation runs against adaptive runs on the same seeds
+    modes = [("fixed", {}),
+             ("adaptive", {"adaptive": True, "patience": args.patience,
+                           "time_budget": args.time_budget})]
+    for name, options in modes:
+        best = evaluations = generations = elapsed = 0.0
+        for seed in range(args.seed, args.seed + args.runs):
+            generator = MazeGenerator(ROWS, COLS, engine=args.engine,
+                                      seed=seed, unreachable=args.unreachable,
+                                      **options)
+            seconds, _ = timed(generator.generate_maze)
+            last = generator.trace[-1]
+            best += max(stats.best for stats in generator.trace)
+            evaluations += last.evaluations
+            generations += last.generation
+            elapsed += seconds
+            if args.trace and name == "adaptive":
+                generator.dump_trace(f"{args.trace}-{seed}.csv")
+        runs = args.runs
+        print(f"{name:>8}: best fitness {best / runs:.4f}, "
+              f"{generations / runs:5.1f} generations, "
+              f"{evaluations / runs:6.0f} evaluations, "
+              f"{elapsed / runs:.3f}s per maze")
+
+
+def bench_vector(args):
+    # Game steps per second with random actions: one GameState per game
+    # against all games in one VecGameState (done games restart at once)
+    import numpy as np
+    from game import GameState
+    from replay import INPUTS
+    from vecgame import VecGameState
+    maze = Maze(engine=args.engine, seed=args.seed, distance_table=True,
+                rng=random.Random(args.seed))
+    rng = random.Random(args.seed)
+    states = [GameState(maze=maze, seed=args.seed + i) for i in range(8)]
+    start = time.perf_counter()
+    steps = 0
+    for _ in range(args.ticks):
+        for i, state in enumerate(states):
+            if state.done:
+                # These games all eat the maze's one set of pellets; that
+                # does not matter for timing the rules
+                states[i] = state = GameState(maze=maze, seed=steps)
+            state.step(*rng.choice(INPUTS))
+            steps += 1
+    elapsed = time.perf_counter() - start
+    print(f"    GameState: {steps / elapsed:12,.0f} steps/s")
+    actions = np.random.default_rng(args.seed)
+    for n in args.games:
+        env = VecGameState(n, maze=maze, seed=args.seed)
+        start = time.perf_counter()
+        for _ in range(args.ticks):
+            _, _, done = env.step(actions.integers(len(INPUTS), size=n))
+            if done.any():
+                env.reset(done)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>6} games: {n * args.ticks / elapsed:12,.0f} steps/s "
+              f"({elapsed / args.ticks * 1e3:.3f} ms per batch step)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pac-Man benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    gen = sub.add_parser("generation", help="GA maze generation time")
+    gen.add_argument("--engines", nargs="+", default=["python", "numpy"])
+    gen.add_argument("--workers", nargs="+", type=int, default=[1])
+    gen.add_argument("--seed", type=int, default=0)
+    gen.add_argument("--cache-size", type=int, default=4096)
+    gen.add_argument("--incremental", action="store_true",
+                     help="also time incremental python evaluation")
+    gen.set_defaults(func=bench_generation)
+
+    ai = sub.add_parser("ghost-ai", help="per-tick ghost AI cost")
+    ai.add_argument("--ticks", type=int, default=2000)
+    ai.add_argument("--seed", type=int, default=0)
+    ai.set_defaults(func=bench_ghost_ai)
+
+    search = sub.add_parser("search", help="path search latency/allocations")
+    search.add_argument("--pairs", type=int, default=500)
+    search.add_argument("--seed", type=int, default=0)
+    search.set_defaults(func=bench_search)
+
+    pellets = sub.add_parser("pellets", help="pellet eating and win checks")
+    pellets.add_argument("--sizes", nargs="+", type=int,
+                         default=[24, 64, 128, 200])
+    pellets.set_defaults(func=bench_pellets)
+
+    ga = sub.add_parser("ga", help="fixed vs adaptive GA runs")
+    ga.add_argument("--runs", type=int, default=10)
+    ga.add_argument("--seed", type=int, default=0)
+    ga.add_argument("--engine", default="numpy")
+    ga.add_argument("--patience", type=int, default=10)
+    ga.add_argument("--time-budget", type=float, default=None)
+    ga.add_argument("--unreachable", default="penalize",
+                    choices=["penalize", "seal"])
+    ga.add_argument("--trace", default=None,
+                    help="write each adaptive run's trace to TRACE-<seed>.csv")
+    ga.set_defaults(func=bench_ga)
+
+    replan = sub.add_parser("replanning",
+                            help="incremental vs from-scratch ghost search")
+    replan.add_argument("--pacman-steps", nargs="+", type=int,
+                        default=[0, 1, 3])
+    replan.add_argument("--mazes", type=int, default=5)
+    replan.add_argument("--ticks", type=int, default=300)
+    replan.add_argument("--engine", default="numpy")
+    replan.add_argument("--seed", type=int, default=0)
+    replan.set_defaults(func=bench_replanning)
+
+    startup = sub.add_parser("startup", help="import and first-frame time")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--seed", type=int, default=0)
+    startup.add_argument("--engine", default="numpy")
+    startup.set_defaults(func=bench_startup)
+
+    spawn = sub.add_parser("spawn", help="ghost setup cost by board size")
+    spawn.add_argument("--sizes", nargs="+", type=int,
+                       default=[24, 64, 128, 200])
+    spawn.add_argument("--min-distance", type=int, default=10)
+    spawn.add_argument("--list-max", type=int, default=64,
+                       help="largest size to time the old list-based BFS on")
+    spawn.add_argument("--engine", default="numpy")
+    spawn.add_argument("--seed", type=int, default=0)
+    spawn.set_defaults(func=bench_spawn)
+
+    vector = sub.add_parser("vector",
+                            help="lockstep NumPy games vs GameState")
+    vector.add_argument("--games", nargs="+", type=int,
+                        default=[1, 64, 1024, 8192])
+    vector.add_argument("--ticks", type=int, default=500)
+    vector.add_argument("--engine", default="numpy")
+    vector.add_argument("--seed", type=int, default=0)
+    vector.set_defaults(func=bench_vector)
+
+    scaling = sub.add_parser("scaling", help="board size scaling")
+    scaling.add_argument("--sizes", nargs="+", type=int,
+                         default=[24, 64, 128, 200])
+    scaling.add_argument("--generations", type=int, default=10)
+    scaling.add_argument("--ticks", type=int, default=50)
+    scaling.add_argument("--engine", default="numpy")
+    scaling.add_argument("--seed", type=int, default=0)
+    scaling.set_defaults(func=bench_scaling)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import random
+import time
+from maze import Maze
+from pacman import PacMan
+from ghost import Ghost
+from pathfinding import PursuitField
+from profiler import NULL_PROFILER
+from utils import POWER_DURATION, GHOST_MOVE_INTERVAL
+
+
+class GameState:
+    # The rules of one game with no rendering and no wall clock: every call
+    # to step() advances the game by exactly one tick. Frontends (main.py,
+    # bots, test harnesses) decide how often to call it.
+    def __init__(self, maze=None, seed=None, power_duration=POWER_DURATION,
+                 ghost_interval=GHOST_MOVE_INTERVAL, shared_pursuit=False,
+                 spawn_distance=0, incremental_ghosts=False,
+                 profiler=NULL_PROFILER, **maze_options):
+        self.seed = seed
+        self.profiler = profiler
+        self.rng = random.Random(seed) if seed is not None else random
+        if maze is None:
+            maze = Maze(seed=seed, rng=self.rng, profiler=profiler,
+                        **maze_options)
+        self.maze = maze
+        self.pacman = PacMan()
+        self.ghosts = Ghost.create_ghosts(maze, rng=self.rng,
+                                          min_distance=spawn_distance)
+        if incremental_ghosts:
+            for ghost in self.ghosts:
+                ghost.use_incremental_planner(maze.rows, maze.cols)
+        self.power_duration = power_duration
+        self.ghost_interval = ghost_interval
+        self.pursuit = PursuitField(maze.rows, maze.cols) if shared_pursuit else None
+        self.tick = 0
+        self.status = "playing"
+
+    @property
+    def done(self):
+        return self.status != "playing"
+
+    def step(self, dx=0, dy=0):
+        # Returns the (kind, detail) events that happened during this tick
+        events = []
+        if self.status != "playing":
+            return events
+        pacman = self.pacman
+        ghosts = self.ghosts
+        maze = self.maze
+        now = self.tick
+
+        if dx != 0 or dy != 0:
+            pellets_left = len(maze.pellets)
+            move_result = pacman.move(dx, dy, maze, now)
+            if len(maze.pellets) < pellets_left:
+                events.append(("pellet", (pacman.x, pacman.y)))
+            events.extend(pacman.handle_collisions(ghosts, maze))
+            if pacman.lives <= 0:
+                self.status = "game_over"
+                events.append(("game_over", pacman.score))
+                return events
+            if move_result == "win":
+                self.status = "won"
+                events.append(("won", pacman.score))
+            elif move_result == "power":
+                events.append(("power", (pacman.x, pacman.y)))
+                for g in ghosts:
+                    g.ate_during_power = False
+                    g.just_respawned = False
+
+        pacman.handle_powerup_expiration(ghosts, self.power_duration, now)
+        for ghost in ghosts:
+            ghost.update_scared_state(pacman)
+
+        self.tick += 1
+        if self.tick % self.ghost_interval == 0:
+            with self.profiler.phase("ghosts"):
+                for ghost in ghosts:
+                    ghost.handle_ai_move(pacman, maze, ghosts, self.pursuit)
+                    if ghost.check_pacman_caught(pacman):
+                        pacman.lives -= 1
+                        events.append(("caught", ghost.name))
+                        if pacman.lives <= 0:
+                            self.status = "game_over"
+                            events.append(("game_over", pacman.score))
+                        else:
+                            pacman.reset_after_death(ghosts)
+                            events.append(("death", ghost.name))
+                        break
+        return events
+
+
+class TickClock:
+    # Fixed-timestep accumulator: turns elapsed wall time into a whole
+    # number of simulation ticks at rate ticks per second, independent of
+    # how often the caller renders. At most max_ticks are handed out per
+    # call; time beyond that is dropped (and counted), so an overloaded
+    # machine slows the game down instead of falling further behind.
+    def __init__(self, rate, max_ticks=5, clock=time.perf_counter):
+        self.interval = 1.0 / rate
+        self.max_ticks = max_ticks
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last = None
+        self.dropped = 0
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last = self.clock()
+
+    def due(self):
+        # Ticks to simulate now
+        now = self.clock()
+        if self.last is None:
+            self.last = now
+        self.accumulator += now - self.last
+        self.last = now
+        ticks = int(self.accumulator / self.interval)
+        if ticks > self.max_ticks:
+            self.dropped += ticks - self.max_ticks
+            self.accumulator = 0.0
+            return self.max_ticks
+        self.accumulator -= ticks * self.interval
+        return ticks
@@ -1,7 +1,6 @@
-from utils import SPRITES, TILE_SIZE, screen, CYAN, ROWS, COLS
+from utils import TILE_SIZE, CYAN
+from pathfinding import grid_search, PursuitField, IncrementalPlanner
 import random
-from collections import deque
-import heapq
 
 GHOST_CONFIGS = [
     ("A*", "Blinky"),
@@ -10,6 +9,10 @@ GHOST_CONFIGS = [
     ("Greedy", "Clyde"),
 ]
 
+SHORTEST_PATH_ALGORITHMS = ("A*", "Dijkstra", "BFS")
+# Ghosts that can keep an IncrementalPlanner between moves
+INCREMENTAL_ALGORITHMS = ("A*", "Dijkstra")
+
 
 class Ghost:
     def __init__(self, x, y, color, algorithm, name):
@@ -27,39 +30,52 @@ class Ghost:
         self.prev_pos = None
         self.just_respawned = False
         self.ate_during_power = False
+        self.rng = random
+        self.planner = None
+
+    def use_incremental_planner(self, rows, cols):
+        # A* and Dijkstra ghosts then repair one search across moves
+        # instead of searching from scratch every time
+        if self.algorithm in INCREMENTAL_ALGORITHMS:
+            self.planner = IncrementalPlanner(
+                rows, cols, heuristic=self.algorithm == "A*")
 
     @staticmethod
-    def create_ghosts(maze):
-        all_empty = []
-        for y in range(ROWS):
-            for x in range(COLS):
-                if maze.grid[y][x] == 0:
-                    all_empty.append((x, y))
-        reachable = set()
-        queue = deque([(1, 1)])
-        reachable.add((1, 1))
-        while queue:
-            x, y = queue.popleft()
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx = x + dx
-                ny = y + dy
-                if (nx, ny) in all_empty and (nx, ny) not in reachable:
-                    reachable.add((nx, ny))
-                    queue.append((nx, ny))
-        spawnable = []
-        for x, y in reachable:
-            if (x, y) == (1, 1):
-                continue
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                neighbor = (x + dx, y + dy)
-                if neighbor in reachable:
-                    spawnable.append((x, y))
-                    break
+    def spawn_cells(maze, min_distance=0):
+        # Reachable cells other than Pac-Man's start that have a reachable
+        # neighbour, in row-major order. With min_distance, only cells at
+        # least that many steps from the start along the maze qualify; if
+        # none are that far, the farthest cells are used instead.
+        grid = maze.grid
+        cols = maze.cols
+        start = cols + 1
+        masks, _ = grid.neighbor_steps()
+        if min_distance > 0:
+            field = PursuitField(maze.rows, maze.cols)
+            field.update(grid, 1, 1)
+            dist = field.dist
+            seen = field.seen
+            stamp = field.stamp
+            cells = [i for i, mask in enumerate(masks)
+                     if mask and seen[i] == stamp and i != start]
+            farthest = max((dist[i] for i in cells), default=0)
+            limit = min(min_distance, farthest)
+            cells = [i for i in cells if dist[i] >= limit]
+        else:
+            reachable, _ = grid.reachable(1, 1)
+            cells = [i for i, mask in enumerate(masks)
+                     if mask and reachable[i] and i != start]
+        return [(i % cols, i // cols) for i in cells]
+
+    @staticmethod
+    def create_ghosts(maze, rng=random, min_distance=0):
+        spawnable = Ghost.spawn_cells(maze, min_distance)
         colors = [(255, 0, 0), (0, 0, 255), (255, 192, 203), (255, 165, 0)]
         ghosts = []
         for i, (alg, name) in enumerate(GHOST_CONFIGS):
-            x, y = random.choice(spawnable)
+            x, y = rng.choice(spawnable)
             ghost = Ghost(x, y, colors[i], alg, name)
+            ghost.rng = rng
             ghost.start_x = x
             ghost.start_y = y
             ghosts.append(ghost)
@@ -83,14 +99,25 @@ class Ghost:
         else:
             self.is_scared = False
 
-    def handle_ai_move(self, pacman, maze, ghosts):
+    def handle_ai_move(self, pacman, maze, ghosts, pursuit=None):
         if self.is_scared:
             self.simple_move_away(pacman.x, pacman.y, maze)
             self.visual_path = []
         else:
             target_x = pacman.x
             target_y = pacman.y
-            if self.algorithm == "A*":
+            if maze.distances is not None and self.algorithm in SHORTEST_PATH_ALGORITHMS:
+                # Every shortest-path ghost walks the precomputed table
+                path = maze.distances.path(self.x, self.y, target_x, target_y)
+            elif pursuit is not None and self.algorithm in SHORTEST_PATH_ALGORITHMS:
+                # Shared field from Pac-Man's cell, rebuilt only after he moves
+                pursuit.update(maze.grid, target_x, target_y)
+                path = pursuit.path(self.x, self.y,
+                                    by_position=self.algorithm != "BFS")
+            elif self.planner is not None:
+                path = self.planner.path(maze.grid, self.x, self.y,
+                                         target_x, target_y)
+            elif self.algorithm == "A*":
                 path = self.a_star(self.x, self.y, target_x, target_y, maze)
             elif self.algorithm == "Dijkstra":
                 path = self.dijkstra(self.x, self.y, target_x, target_y, maze)
@@ -113,81 +140,14 @@ class Ghost:
             self.just_respawned = False
 
     def a_star(self, sx, sy, tx, ty, maze):
-        start = (sx, sy)
-        goal = (tx, ty)
-        open_set = []
-        heapq.heappush(open_set, (0 + abs(sx - tx) +
-                       abs(sy - ty), 0, start, []))
-        closed = set()
-        while open_set:
-            f, g, pos, path = heapq.heappop(open_set)
-            if pos == goal:
-                return path
-            if pos in closed:
-                continue
-            closed.add(pos)
-            x, y = pos
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx = x + dx
-                ny = y + dy
-                if 0 <= nx < COLS and 0 <= ny < ROWS and maze.grid[ny][nx] == 0:
-                    npos = (nx, ny)
-                    if npos in closed:
-                        continue
-                    npath = path + [npos]
-                    h = abs(nx - tx) + abs(ny - ty)
-                    heapq.heappush(open_set, (g + 1 + h, g + 1, npos, npath))
-        return []
+        return grid_search(maze.rows, maze.cols).a_star(maze.grid, sx, sy, tx, ty)
 
     def dijkstra(self, sx, sy, tx, ty, maze):
-        start = (sx, sy)
-        goal = (tx, ty)
-        open_set = []
-        heapq.heappush(open_set, (0, start, []))
-        closed = set()
-        while open_set:
-            g, pos, path = heapq.heappop(open_set)
-            if pos == goal:
-                return path
-            if pos in closed:
-                continue
-            closed.add(pos)
-            x, y = pos
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx = x + dx
-                ny = y + dy
-                if 0 <= nx < COLS and 0 <= ny < ROWS and maze.grid[ny][nx] == 0:
-                    npos = (nx, ny)
-                    if npos in closed:
-                        continue
-                    npath = path + [npos]
-                    heapq.heappush(open_set, (g + 1, npos, npath))
-        return []
+        return grid_search(maze.rows, maze.cols).dijkstra(maze.grid, sx, sy, tx, ty)
 
     def full_bfs_path(self, target_x, target_y, maze):
-        start = (self.x, self.y)
-        goal = (target_x, target_y)
-        queue = deque([(start, [])])
-        visited = {start}
-        while queue:
-            position, path = queue.popleft()
-            x, y = position
-            if position == goal:
-                return path
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx = x + dx
-                ny = y + dy
-                new_pos = (nx, ny)
-                if (
-                    0 <= nx < COLS
-                    and 0 <= ny < ROWS
-                    and maze.grid[ny][nx] == 0
-                    and new_pos not in visited
-                ):
-                    new_path = path + [new_pos]
-                    queue.append((new_pos, new_path))
-                    visited.add(new_pos)
-        return []
+        return grid_search(maze.rows, maze.cols).bfs(
+            maze.grid, self.x, self.y, target_x, target_y)
 
     def check_pacman_caught(self, pacman):
         return (
@@ -201,7 +161,7 @@ class Ghost:
         for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
             nx = self.x + dx
             ny = self.y + dy
-            if 0 <= nx < COLS and 0 <= ny < ROWS and maze.grid[ny][nx] == 0:
+            if maze.grid.is_open(nx, ny):
                 dist = abs(nx - player_x) + abs(ny - player_y)
                 if self.prev_pos and (nx, ny) == self.prev_pos:
                     continue
@@ -210,7 +170,7 @@ class Ghost:
             for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
                 nx = self.x + dx
                 ny = self.y + dy
-                if 0 <= nx < COLS and 0 <= ny < ROWS and maze.grid[ny][nx] == 0:
+                if maze.grid.is_open(nx, ny):
                     dist = abs(nx - player_x) + abs(ny - player_y)
                     valid_moves.append((dist, nx, ny))
         if valid_moves:
@@ -225,7 +185,7 @@ class Ghost:
         for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
             nx = self.x + dx
             ny = self.y + dy
-            if 0 <= nx < COLS and 0 <= ny < ROWS and maze.grid[ny][nx] == 0:
+            if maze.grid.is_open(nx, ny):
                 if self.prev_pos and (nx, ny) == self.prev_pos:
                     continue
                 valid_moves.append((nx, ny))
@@ -233,10 +193,10 @@ class Ghost:
             for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
                 nx = self.x + dx
                 ny = self.y + dy
-                if 0 <= nx < COLS and 0 <= ny < ROWS and maze.grid[ny][nx] == 0:
+                if maze.grid.is_open(nx, ny):
                     valid_moves.append((nx, ny))
         if valid_moves:
-            next_x, next_y = random.choice(valid_moves)
+            next_x, next_y = self.rng.choice(valid_moves)
             self.prev_pos = (self.x, self.y)
             self.x = next_x
             self.y = next_y
@@ -246,7 +206,7 @@ class Ghost:
         for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
             nx = self.x + dx
             ny = self.y + dy
-            if 0 <= nx < COLS and 0 <= ny < ROWS and maze.grid[ny][nx] == 0:
+            if maze.grid.is_open(nx, ny):
                 dist = abs(nx - target_x) + abs(ny - target_y)
                 valid_moves.append((dist, nx, ny))
         path = []
@@ -256,9 +216,16 @@ class Ghost:
             path.append((next_x, next_y))
         return path
 
-    def draw(self):
+    def draw(self, origin=(0, 0), screen=None):
+        # origin is the board cell shown in the top-left corner of the
+        # window; screen defaults to the window
+        import utils
+        from utils import SPRITES
+        if screen is None:
+            screen = utils.screen
         if self.is_scared and not self.just_respawned:
             img = SPRITES["scared"]
         else:
             img = SPRITES.get(self.name.lower(), SPRITES["blinky"])
-        screen.blit(img, (self.x * TILE_SIZE, self.y * TILE_SIZE))
+        screen.blit(img, ((self.x - origin[0]) * TILE_SIZE,
+                          (self.y - origin[1]) * TILE_SIZE))
@@ -0,0 +1,201 @@
+WALL = 1
+OPEN = 0
+
+
+class Grid:
+    # A board stored as one contiguous bytearray (0 = open, 1 = wall),
+    # indexed y * cols + x. grid[y][x] still works through read-only row
+    # views, but hot paths should use cells, is_open or neighbor_steps.
+    def __init__(self, rows, cols, cells=None):
+        self.rows = rows
+        self.cols = cols
+        if cells is None:
+            cells = bytearray(rows * cols)
+        elif len(cells) != rows * cols:
+            raise ValueError(
+                f"expected {rows * cols} cells for a {rows}x{cols} grid, "
+                f"got {len(cells)}")
+        self.cells = bytearray(cells)
+        self._masks = None
+        self._steps = None
+        self._labels = None
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls(len(rows), len(rows[0]),
+                   bytearray(v for row in rows for v in row))
+
+    def to_rows(self):
+        cols = self.cols
+        return [list(self.cells[y * cols:(y + 1) * cols])
+                for y in range(self.rows)]
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.rows:
+            raise IndexError("grid row out of range")
+        cols = self.cols
+        return memoryview(self.cells)[y * cols:(y + 1) * cols].toreadonly()
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        for y in range(self.rows):
+            yield self[y]
+
+    def __eq__(self, other):
+        if isinstance(other, Grid):
+            return (self.rows, self.cols, self.cells) == (
+                other.rows, other.cols, other.cells)
+        if isinstance(other, list):
+            return self.to_rows() == other
+        return NotImplemented
+
+    def __getstate__(self):
+        return (self.rows, self.cols, bytes(self.cells))
+
+    def __setstate__(self, state):
+        rows, cols, cells = state
+        self.__init__(rows, cols, cells)
+
+    def is_open(self, x, y):
+        return (0 <= x < self.cols and 0 <= y < self.rows
+                and self.cells[y * self.cols + x] == OPEN)
+
+    def set(self, x, y, value):
+        self.cells[y * self.cols + x] = value
+        self._masks = None
+        self._labels = None
+
+    def count_open(self):
+        return self.cells.count(OPEN)
+
+    def neighbor_steps(self):
+        # One byte per cell with a bit per open neighbour, in the
+        # (1, 0), (-1, 0), (0, 1), (0, -1) order the searches use, plus the
+        # flat index offsets each mask stands for:
+        #     for step in steps[masks[i]]: j = i + step
+        if self._masks is None:
+            rows = self.rows
+            cols = self.cols
+            cells = self.cells
+            masks = bytearray(rows * cols)
+            for y in range(rows):
+                base = y * cols
+                for x in range(cols):
+                    mask = 0
+                    if x + 1 < cols and not cells[base + x + 1]:
+                        mask |= 1
+                    if x > 0 and not cells[base + x - 1]:
+                        mask |= 2
+                    if y + 1 < rows and not cells[base + cols + x]:
+                        mask |= 4
+                    if y > 0 and not cells[base - cols + x]:
+                        mask |= 8
+                    masks[base + x] = mask
+            offsets = (1, -1, cols, -cols)
+            self._steps = [
+                tuple(off for bit, off in enumerate(offsets) if mask >> bit & 1)
+                for mask in range(16)
+            ]
+            self._masks = masks
+        return self._masks, self._steps
+
+    def flood(self, x, y):
+        # Cells reachable from (x, y), as one flag byte per cell, and how
+        # many there are. The start cell always counts.
+        masks, steps = self.neighbor_steps()
+        reached = bytearray(self.rows * self.cols)
+        start = y * self.cols + x
+        reached[start] = 1
+        queue = [start]
+        for i in queue:
+            for step in steps[masks[i]]:
+                j = i + step
+                if not reached[j]:
+                    reached[j] = 1
+                    queue.append(j)
+        return reached, len(queue)
+
+    def components(self):
+        # Connected-component label of every cell (see label_components),
+        # computed once and shared by everything that needs reachability
+        if self._labels is None:
+            self._labels = label_components(self.cells, self.cols)
+        return self._labels
+
+    def reachable(self, x, y):
+        # Same result as flood(x, y) for an open start cell, read off the
+        # shared component labels instead of a fresh search. A wall start
+        # reaches only itself.
+        labels = self.components()
+        start = y * self.cols + x
+        if self.cells[start] != OPEN:
+            reached = bytearray(len(labels))
+            reached[start] = 1
+            return reached, 1
+        root = labels[start]
+        reached = bytearray(label == root for label in labels)
+        return reached, reached.count(1)
+
+
+def component_runs(cells, cols):
+    # Union-find over horizontal runs of open cells rather than single
+    # cells: each run is joined with the runs it touches in the row above,
+    # found with a two-pointer sweep. Returns the runs as (start, end) flat
+    # index ranges in row-major order and the index of each run's root run,
+    # which is always the first run of its component.
+    runs = []
+    parent = []
+    above = 0
+    for base in range(0, len(cells), cols):
+        end = base + cols
+        row = len(runs)
+        p = above
+        i = cells.find(0, base, end)
+        while i >= 0:
+            j = cells.find(1, i, end)
+            if j < 0:
+                j = end
+            k = len(runs)
+            runs.append((i, j))
+            parent.append(k)
+            while p < row and runs[p][1] <= i - cols:
+                p += 1
+            q = p
+            while q < row and runs[q][0] < j - cols:
+                a = k
+                while parent[a] != a:
+                    parent[a] = parent[parent[a]]
+                    a = parent[a]
+                b = q
+                while parent[b] != b:
+                    parent[b] = parent[parent[b]]
+                    b = parent[b]
+                if a < b:
+                    parent[b] = a
+                elif b < a:
+                    parent[a] = b
+                q += 1
+            # The last run touched above may also touch the next run here
+            if q > p:
+                p = q - 1
+            i = cells.find(0, j, end) if j < end else -1
+        above = row
+    for k in range(len(parent)):
+        parent[k] = parent[parent[k]]
+    return runs, parent
+
+
+def label_components(cells, cols):
+    # Connected-component label of every cell: open cells get the lowest
+    # cell index in their component, walls stay their own index
+    labels = list(range(len(cells)))
+    runs, roots = component_runs(cells, cols)
+    for (i, j), root in zip(runs, roots):
+        labels[i:j] = [runs[root][0]] * (j - i)
+    return labels
+
+
+def as_grid(grid):
+    return grid if isinstance(grid, Grid) else Grid.from_rows(grid)
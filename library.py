@@ -0,0 +1,239 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from grid import Grid
+from maze import Maze, DistanceTable
+from pathfinding import PursuitField
+from utils import ROWS, COLS
+
+# File layout (little-endian):
+#   header   magic, version, rows, cols, count
+#   index    count + 1 uint64 offsets; record i is offsets[i]:offsets[i + 1]
+#   records  fitness f64, power pellet count u32 + MAX_POWER u32 cells,
+#            wall bits (one per cell, row-major, MSB first),
+#            distance from Pac-Man's start per cell (u16, 0xFFFF = none),
+#            open cell count n u32 (0 = no table) + dist and next_hop
+#            tables (n * n u16 each, as in DistanceTable)
+MAGIC = b"PACMAZE\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHHHI")
+RECORD_HEAD = struct.Struct("<dI")
+MAX_POWER = 4
+NO_CELL = 0xFFFFFFFF
+UNREACHABLE = 0xFFFF
+
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+# One byte per bit, MSB first, for unpacking wall bits
+_UNPACK = [bytes((b >> (7 - k)) & 1 for k in range(8)) for b in range(256)]
+
+MazeRecord = namedtuple(
+    "MazeRecord",
+    ["grid", "fitness", "power_pellets", "start_distances", "distances"])
+
+
+def pack_bits(cells):
+    bits = bytes(cells).translate(_BIT_CHARS)
+    bits += b"0" * (-len(bits) % 8)
+    return int(bits, 2).to_bytes(len(bits) // 8, "big")
+
+
+def unpack_bits(packed, size):
+    return bytearray(b"".join(_UNPACK[b] for b in packed)[:size])
+
+
+def pack_record(maze):
+    grid = maze.grid
+    power = [y * grid.cols + x for x, y in maze.power_pellets]
+    if len(power) > MAX_POWER:
+        raise ValueError(f"at most {MAX_POWER} power pellets can be stored")
+    field = PursuitField(grid.rows, grid.cols)
+    field.update(grid, 1, 1)
+    start = array("H", [UNREACHABLE]) * (grid.rows * grid.cols)
+    for y in range(grid.rows):
+        for x in range(grid.cols):
+            d = field.distance(x, y)
+            if d is not None:
+                start[y * grid.cols + x] = d
+    parts = [
+        RECORD_HEAD.pack(maze.generator.fitness(grid), len(power)),
+        array("I", power + [NO_CELL] * (MAX_POWER - len(power))).tobytes(),
+        pack_bits(grid.cells),
+        start.tobytes(),
+    ]
+    table = maze.distances
+    if table is None:
+        parts.append(struct.pack("<I", 0))
+    else:
+        parts.append(struct.pack("<I", table.size))
+        parts.append(table.dist.tobytes())
+        parts.append(table.next_hop.tobytes())
+    return b"".join(parts)
+
+
+class MazeLibrary:
+    # Read-only view of a maze library file. The file is memory-mapped and
+    # only the header is read up front; records are decoded when picked.
+    # Distance tables are not copied: a record's tables are u16 views into
+    # the map.
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rows, cols, count = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a maze library")
+        if version != VERSION:
+            raise ValueError(f"unsupported maze library version {version}")
+        self.rows = rows
+        self.cols = cols
+        self.count = count
+        self.offsets = memoryview(self._map)[
+            HEADER.size:HEADER.size + 8 * (count + 1)].cast("Q")
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.offsets.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Records picked earlier still view their distance tables in
+            # the map; it is unmapped once the last of them is gone
+            pass
+        self._file.close()
+
+    def raw(self, i):
+        return self._map[self.offsets[i]:self.offsets[i + 1]]
+
+    def fitness(self, i):
+        return RECORD_HEAD.unpack_from(self._map, self.offsets[i])[0]
+
+    def record(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError("maze library index out of range")
+        size = self.rows * self.cols
+        mm = self._map
+        pos = self.offsets[i]
+        fitness, power_count = RECORD_HEAD.unpack_from(mm, pos)
+        pos += RECORD_HEAD.size
+        power = array("I", mm[pos:pos + 4 * MAX_POWER])[:power_count]
+        pos += 4 * MAX_POWER
+        packed = -(-size // 8)
+        grid = Grid(self.rows, self.cols, unpack_bits(mm[pos:pos + packed], size))
+        pos += packed
+        start = array("H", mm[pos:pos + 2 * size])
+        pos += 2 * size
+        (n,) = struct.unpack_from("<I", mm, pos)
+        pos += 4
+        distances = None
+        if n:
+            view = memoryview(mm)[pos:pos + 4 * n * n].cast("H")
+            distances = DistanceTable(grid, view[:n * n], view[n * n:])
+        return MazeRecord(grid, fitness, list(power), start, distances)
+
+    def pick(self, rng=random):
+        if not self.count:
+            raise IndexError(f"cannot pick from {self.path}: it has no mazes")
+        return self.record(rng.randrange(self.count))
+
+
+def write_library(path, rows, cols, records):
+    # records are packed byte strings from pack_record
+    offset = HEADER.size + 8 * (len(records) + 1)
+    offsets = array("Q", [offset])
+    for record in records:
+        offset += len(record)
+        offsets.append(offset)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rows, cols, len(records)))
+        f.write(offsets.tobytes())
+        for record in records:
+            f.write(record)
+    os.replace(tmp, path)
+
+
+def generate_record(seed, rows, cols, engine, distance_table):
+    maze = Maze(engine=engine, seed=seed, rng=random.Random(seed),
+                distance_table=distance_table, rows=rows, cols=cols)
+    return pack_record(maze)
+
+
+def build_library(path, count, seed=0, rows=ROWS, cols=COLS, engine="python",
+                  workers=None, distance_table=False, append=False):
+    records = []
+    if append and os.path.exists(path):
+        existing = MazeLibrary(path)
+        if (existing.rows, existing.cols) != (rows, cols):
+            raise ValueError(f"{path} holds {existing.rows}x{existing.cols} "
+                             f"mazes, not {rows}x{cols}")
+        records = [existing.raw(i) for i in range(len(existing))]
+        existing.close()
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(generate_record, seed + i, rows, cols, engine,
+                        distance_table)
+            for i in range(count)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            elapsed = time.perf_counter() - start
+            print(f"\r{done}/{count} mazes, {done / elapsed:.2f} mazes/s",
+                  end="", flush=True)
+    records.extend(future.result() for future in futures)
+    write_library(path, rows, cols, records)
+    print(f"\n{path}: {len(records)} mazes, "
+          f"{os.path.getsize(path) / 1024:.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generated maze library")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="generate mazes into a library file")
+    build.add_argument("path")
+    build.add_argument("--count", type=int, default=100)
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--rows", type=int, default=ROWS)
+    build.add_argument("--cols", type=int, default=COLS)
+    build.add_argument("--engine", default="python")
+    build.add_argument("--workers", type=int, default=None)
+    build.add_argument("--distance-table", action="store_true",
+                       help="also store the all-pairs distance tables")
+    build.add_argument("--append", action="store_true",
+                       help="keep the mazes already in the file")
+
+    info = sub.add_parser("info", help="summarize a library file")
+    info.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_library(args.path, args.count, args.seed, args.rows, args.cols,
+                      args.engine, args.workers, args.distance_table,
+                      args.append)
+    else:
+        library = MazeLibrary(args.path)
+        scores = [library.fitness(i) for i in range(len(library))]
+        line = (f"{args.path}: {len(library)} {library.rows}x{library.cols} "
+                f"mazes, fitness {min(scores, default=0):.3f}.."
+                f"{max(scores, default=0):.3f}")
+        if len(library):
+            start = time.perf_counter()
+            library.pick()
+            line += f", random pick {(time.perf_counter() - start) * 1e6:.0f} us"
+        print(line)
+        library.close()
+
+
+if __name__ == "__main__":
+    main()
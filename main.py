@@ -1,23 +1,54 @@
+import os
 import pygame
+import random
 import time
-from maze import Maze
-from pacman import PacMan
-from ghost import Ghost, GHOST_CONFIGS
-from utils import SCREEN_WIDTH, SCREEN_HEIGHT, FPS, RED, BLUE, PINK, ORANGE, ROWS, COLS, font, screen, clock, game_over_screen, TILE_SIZE
+from game import GameState, TickClock
+from profiler import NULL_PROFILER, Profiler
+from renderer import Renderer
+from utils import (FPS, RENDER_FPS, MAX_TICKS_PER_FRAME, DEATH_PAUSE, ROWS,
+                   COLS, game_over_screen, show_loading_screen)
 
 
-def main_game(show_ghost_paths, show_generations):
+def main_game(show_ghost_paths, show_generations, distance_table=False,
+              shared_pursuit=False, rows=ROWS, cols=COLS, library=None,
+              producer=None, speed=1.0, record_dir=None,
+              profiler=NULL_PROFILER, autopilot=None):
+    recorder = None
     try:
-        maze = Maze(show_generations=show_generations)
-        pacman = PacMan()
-        ghosts = Ghost.create_ghosts(maze)
+        from utils import clock, screen, SPRITES, font
+        show_loading_screen()
+        if record_dir is not None:
+            # Recorded games generate their own seeded maze so replay.py
+            # can rebuild them; the library and producer are not used
+            from replay import Recorder
+            recorder = Recorder(random.randrange(2 ** 63),
+                                distance_table=distance_table,
+                                shared_pursuit=shared_pursuit,
+                                rows=rows, cols=cols, profiler=profiler)
+            state = recorder.state
+        else:
+            state = GameState(show_generations=show_generations,
+                              distance_table=distance_table,
+                              shared_pursuit=shared_pursuit,
+                              rows=rows, cols=cols, library=library,
+                              producer=producer, profiler=profiler)
+        step = recorder.step if recorder is not None else state.step
+        if producer is not None:
+            print(f"Maze ready after {producer.last_wait * 1000:.0f} ms, "
+                  f"{producer.last_saved:.2f}s of generation avoided "
+                  f"({producer.total_saved:.2f}s this session)")
+        pygame.display.set_caption("Pac-Man with AI")
+        renderer = Renderer(screen, SPRITES, font, profiler)
+        renderer.reset(state)
+        # The simulation advances in fixed ticks (FPS per second, times
+        # speed) however often the window is redrawn; when frames run
+        # late, several ticks are simulated and only the last is drawn
+        ticks = TickClock(FPS * speed, MAX_TICKS_PER_FRAME)
+        ticks.reset()
+        pause = 0
+        overlay = False
 
         running = True
-        game_state = "playing"
-        power_duration = 10  # seconds
-        frame_count = 0
-
-        ghost_path_colors = [RED, BLUE, PINK, ORANGE]
 
         while running:
             for event in pygame.event.get():
@@ -25,8 +56,11 @@ def main_game(show_ghost_paths, show_generations):
                     running = False
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     running = False
+                if (event.type == pygame.KEYDOWN and event.key == pygame.K_F3
+                        and profiler.enabled):
+                    overlay = not overlay
 
-            if game_state == "playing":
+            if state.status == "playing":
                 dx = 0
                 dy = 0
                 keys = pygame.key.get_pressed()
@@ -39,61 +73,33 @@ def main_game(show_ghost_paths, show_generations):
                 elif keys[pygame.K_RIGHT]:
                     dx = 1
 
-                if dx != 0 or dy != 0:
-                    move_result = pacman.move(dx, dy, maze)
-                    pacman.handle_collisions(ghosts, maze)
-                    if move_result == "win":
-                        game_state = "won"
-                    elif move_result == "power":
-                        for g in ghosts:
-                            g.ate_during_power = False
-                            g.just_respawned = False
-
-                pacman.handle_powerup_expiration(ghosts, power_duration)
-                for ghost in ghosts:
-                    ghost.update_scared_state(pacman)
-
-                frame_count += 1
-                if frame_count % 3 == 0:
-                    for ghost in ghosts:
-                        ghost.handle_ai_move(pacman, maze, ghosts)
-                        if ghost.check_pacman_caught(pacman):
-                            pacman.lives -= 1
-                            if pacman.lives <= 0:
-                                game_state = "game_over"
-                            else:
-                                pacman.reset_after_death(ghosts)
+                due = ticks.due()
+                with profiler.phase("frame.simulate"):
+                    for _ in range(due):
+                        if pause:
+                            # Hold still for a moment after losing a life
+                            pause -= 1
+                            continue
+                        if autopilot is not None:
+                            with profiler.phase("autopilot"):
+                                dx, dy = autopilot.choose(state)
+                        for kind, _ in step(dx, dy):
+                            if kind == "death":
+                                pause = DEATH_PAUSE
+                        if state.status != "playing":
                             break
 
-                screen.fill((0, 0, 0))
-                maze.draw()
-                pacman.draw()
-                ghost_distances = [
-                    ((ghost.x - pacman.x) ** 2 + (ghost.y - pacman.y) ** 2)
-                    for ghost in ghosts
-                ]
-                closest_idx = ghost_distances.index(min(ghost_distances))
-                draw_order = [i for i in range(
-                    len(ghosts)) if i != closest_idx] + [closest_idx]
-                for ghost_idx in draw_order:
-                    ghost = ghosts[ghost_idx]
-                    if show_ghost_paths and hasattr(ghost, "visual_path") and ghost.visual_path:
-                        color = ghost_path_colors[ghost_idx % len(
-                            ghost_path_colors)]
-                        points = [
-                            (ghost.x * TILE_SIZE + TILE_SIZE // 2,
-                             ghost.y * TILE_SIZE + TILE_SIZE // 2)
-                        ] + [
-                            (gx * TILE_SIZE + TILE_SIZE // 2,
-                             gy * TILE_SIZE + TILE_SIZE // 2)
-                            for gx, gy in ghost.visual_path
-                        ]
-                        if len(points) > 1:
-                            pygame.draw.lines(screen, color, False, points, 3)
-                    ghost.draw()
-                pacman.draw_hud()
-            elif game_state in ("game_over", "won"):
-                result = game_over_screen(pacman.score, game_state == "won")
+                if due:
+                    with profiler.phase("frame.render"):
+                        renderer.draw(state, show_ghost_paths)
+                        if overlay:
+                            lines = profiler.report()
+                            if autopilot is not None:
+                                lines.append(autopilot.report())
+                            renderer.draw_overlay(lines)
+            elif state.status in ("game_over", "won"):
+                result = game_over_screen(
+                    state.pacman.score, state.status == "won")
                 if result == "restart":
                     return True
                 elif result == "quit":
@@ -112,22 +118,69 @@ def main_game(show_ghost_paths, show_generations):
                                     running = False
                                     waiting = False
 
-            pygame.display.flip()
-            clock.tick(FPS)
+            with profiler.phase("frame.wait"):
+                frame_ms = clock.tick(RENDER_FPS)
+            profiler.record("frame", frame_ms / 1000)
     except Exception as e:
         from utils import show_error_screen
         return show_error_screen(str(e))
+    finally:
+        if recorder is not None:
+            path = os.path.join(record_dir, f"game-{recorder.seed}.rec")
+            recorder.save(path)
+            print(f"Recorded {len(recorder.inputs)} ticks to {path}")
     return False
 
 
 if __name__ == "__main__":
-    pygame.init()
     restart = True
-    time.sleep(10)
     SHOW_GHOST_PATHS = True
     SHOW_GENERATIONS = False  # Toggle this to show/hide maze generation visualization
+    USE_DISTANCE_TABLE = False  # Precompute all-pairs distances for the ghosts
+    SHARED_PURSUIT = False  # One search from Pac-Man per AI tick for all ghosts
+    BOARD_ROWS = ROWS  # Boards larger than the window scroll with Pac-Man
+    BOARD_COLS = COLS
+    MAZE_LIBRARY = None  # Path to a file built with library.py, or None
+    # Mazes generated in a background process for restarts; 0 = off. Ignored
+    # with SHOW_GENERATIONS, since the worker process never draws
+    PREFETCH_MAZES = 0
+    GAME_SPEED = 1.0  # Simulation ticks per second as a multiple of FPS
+    RECORD_DIR = None  # Directory to save each game's inputs to, or None
+    PROFILE = False  # Time each phase of the loop; F3 shows the percentiles
+    PROFILE_DUMP = "profile.csv"  # Written on exit when PROFILE is on (.csv/.json)
+    STARTUP_DELAY = 0  # Seconds to wait before the first game, e.g. for recording
+    AUTOPILOT_MS = None  # Let the autopilot play with this search budget per tick
+
+    profiler = Profiler(enabled=PROFILE)
+    library = None
+    if MAZE_LIBRARY is not None:
+        from library import MazeLibrary
+        library = MazeLibrary(MAZE_LIBRARY)
+    producer = None
+    if library is None and PREFETCH_MAZES > 0 and not SHOW_GENERATIONS:
+        from prefetch import MazeProducer
+        producer = MazeProducer(BOARD_ROWS, BOARD_COLS, depth=PREFETCH_MAZES,
+                                distance_table=USE_DISTANCE_TABLE)
+        producer.fill()
+    autopilot = None
+    if AUTOPILOT_MS is not None:
+        from autopilot import Autopilot
+        autopilot = Autopilot(budget_ms=AUTOPILOT_MS)
 
+    if STARTUP_DELAY:
+        time.sleep(STARTUP_DELAY)
     while restart:
         restart = main_game(show_ghost_paths=SHOW_GHOST_PATHS,
-                            show_generations=SHOW_GENERATIONS)
+                            show_generations=SHOW_GENERATIONS,
+                            distance_table=USE_DISTANCE_TABLE,
+                            shared_pursuit=SHARED_PURSUIT,
+                            rows=BOARD_ROWS, cols=BOARD_COLS,
+                            library=library, producer=producer,
+                            speed=GAME_SPEED, record_dir=RECORD_DIR,
+                            profiler=profiler, autopilot=autopilot)
+    if producer is not None:
+        producer.close()
+    if profiler.enabled:
+        print("\n".join(profiler.report()))
+        profiler.dump(PROFILE_DUMP)
     pygame.quit()
@@ -1,21 +1,154 @@
-from collections import deque
+from array import array
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress
+import csv
+import hashlib
+import json
+import math
 import random
-from utils import ROWS, COLS, SPRITES, screen, TILE_SIZE, font
+import time
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from grid import Grid, as_grid, component_runs
+from profiler import NULL_PROFILER
+from utils import ROWS, COLS, TILE_SIZE, VIEW_ROWS, VIEW_COLS
+
+
+FITNESS_ENGINES = ("python", "numpy")
+# What happens to open cells Pac-Man cannot reach: the candidate is scored
+# below every solvable one, or the pockets are walled up before scoring
+UNREACHABLE_POLICIES = ("penalize", "seal")
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+# Bit-parallel BFS of one candidate, kept for incremental evaluation: its
+# open cells as one integer (cell i is bit size - 1 - i), the cells at each
+# distance from (1, 1) in the same form, how many cells were reached and
+# are walls, and the distance to each far corner (rows + cols if unreached)
+FloodLevels = namedtuple("FloodLevels",
+                         ["open", "levels", "reached", "walls", "corners"])
+GenerationStats = namedtuple(
+    "GenerationStats",
+    ["generation", "best", "mean", "diversity", "mutation_rate", "immigrants",
+     "evaluations", "seconds"])
+
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+_OPEN_CHARS = bytes.maketrans(b"\x00\x01", b"10")
+_OPEN_FLAGS = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+# (x, y) of every flat cell index, one list per board size
+_positions = {}
+# Maps a random byte to a wall with probability exactly 64/256
+_WALL_QUARTER = bytes(1 if b < 64 else 0 for b in range(256))
+
+# Above this many open cells the all-pairs distance table is skipped
+MAX_TABLE_CELLS = 2048
+
+
+def _unsolvable_score(reached, total_open):
+    # Below every solvable candidate, but still ranked by how much of the
+    # board is reachable from Pac-Man's start. On small boards most
+    # candidates are solvable; on large ones almost none are, and this is
+    # what keeps the GA from handing back a maze with Pac-Man walled in.
+    return -1 + reached / (total_open + 2)
+
+
+def diversity(population):
+    # Mean fraction of cells on which two candidates differ, over all pairs.
+    # Cells are 0/1 bytes, so each differing cell is exactly one set bit in
+    # the XOR of the candidates read as integers.
+    values = [int.from_bytes(grid, "little") for grid in population]
+    pairs = len(values) * (len(values) - 1) // 2
+    if not pairs:
+        return 0.0
+    differing = sum((a ^ b).bit_count()
+                    for i, a in enumerate(values) for b in values[i + 1:])
+    return differing / (pairs * len(population[0]))
+
+
+def grid_key(grid):
+    # 128-bit digest of a flat candidate packed one bit per cell
+    bits = bytes(grid).translate(_BIT_CHARS)
+    packed = int(bits, 2).to_bytes(-(-len(bits) // 8), "big")
+    return hashlib.blake2b(packed, digest_size=16).digest()
 
 
 class MazeGenerator:
-    def __init__(self, rows, cols, show_generations=False):
+    # Candidates are flat bytearrays of rows * cols cells (0 = open,
+    # 1 = wall), indexed y * cols + x, so large boards stay compact.
+    #
+    # With adaptive=True the run stops once the best score has not improved
+    # for patience generations or time_budget seconds have passed;
+    # generations is then only an upper bound. The mutation rate and
+    # immigrant count also follow the diversity of the elites: once they
+    # have converged below DIVERSITY_TARGET, mutation gets finer (big
+    # mutations mostly break solvability of a good maze) and more random
+    # immigrants supply the exploration instead. Both return towards their
+    # base values while the elites are diverse.
+    DIVERSITY_TARGET = 0.12
+    MIN_MUTATION_RATE = 0.005
+
+    def __init__(self, rows, cols, show_generations=False, engine="python",
+                 workers=1, seed=None, cache_size=4096, population_size=30,
+                 generations=100, elite_size=10, immigrants=2,
+                 mutation_rate=0.03, adaptive=False, patience=10,
+                 time_budget=None, incremental=False, unreachable="penalize",
+                 profiler=NULL_PROFILER):
+        if engine not in FITNESS_ENGINES:
+            raise ValueError(f"Unknown fitness engine: {engine}")
+        if unreachable not in UNREACHABLE_POLICIES:
+            raise ValueError(f"Unknown unreachable-cell policy: {unreachable}")
+        if engine == "numpy" and np is None:
+            raise ImportError("The numpy fitness engine requires numpy")
         self.rows = rows
         self.cols = cols
         self.show_generations = show_generations
+        self.engine = engine
+        self.workers = max(1, workers)
+        self.seed = seed
+        self.rng = random
+        self._pool = None
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.population_size = population_size
+        self.generations = generations
+        self.elite_size = elite_size
+        self.immigrants = immigrants
+        self.mutation_rate = mutation_rate
+        self.adaptive = adaptive
+        self.patience = patience
+        self.time_budget = time_budget
+        self.trace = []
+        # Candidates scored during the current run (cache hits excluded)
+        self.evaluations = 0
+        # Incremental evaluation (python engine only): children remember
+        # their two parents, the crossover band and the mutation flips, and
+        # evaluated candidates keep their FloodLevels, so a child's BFS
+        # starts from the levels its start band's parent shares with it.
+        # Both maps hold (candidate, value) pairs for the live population
+        # only.
+        self.incremental = incremental
+        self._parents = {}
+        self._fields = {}
+        self.repaired = 0
+        self.full_floods = 0
+        self.levels_reused = 0
+        self.levels_flooded = 0
+        self.unreachable = unreachable
+        self.sealed = 0
+        self.profiler = profiler
 
     def draw_grid(self, grid, highlight=None, caption=None):
         # Helper to draw a given grid (for visualization)
-        from utils import screen, SPRITES, TILE_SIZE, pygame, SCREEN_WIDTH, SCREEN_HEIGHT, BLACK
+        import pygame
+        from utils import screen, SPRITES, BLACK
         screen.fill(BLACK)
-        for row in range(ROWS):
-            for col in range(COLS):
-                if grid[row][col] == 1:
+        for row in range(min(self.rows, VIEW_ROWS)):
+            for col in range(min(self.cols, VIEW_COLS)):
+                if grid[row * self.cols + col] == 1:
                     screen.blit(SPRITES["wall"],
                                 (col * TILE_SIZE, row * TILE_SIZE))
         if highlight:
@@ -27,194 +160,673 @@ class MazeGenerator:
         pygame.display.flip()
 
     def generate_maze(self):
-        import pygame
-        import time
+        # A fixed seed gives every run its own RNG stream; the fitness
+        # evaluation is deterministic, so the worker count never changes
+        # which maze comes out.
+        self.rng = random.Random(self.seed) if self.seed is not None else random
+        if self.workers == 1:
+            return self._run_generations()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            self._pool = pool
+            try:
+                return self._run_generations()
+            finally:
+                self._pool = None
+
+    def _run_generations(self):
+        start = time.perf_counter()
+        self.trace = []
+        self.evaluations = 0
+        rate = self.mutation_rate
+        immigrants = self.immigrants
+        best_score = None
+        stale = 0
         population = []
-        for _ in range(30):
+        for _ in range(self.population_size):
             population.append(self._random_candidate())
-        for gen in range(100):
-            scored = sorted(population, key=self._fitness, reverse=True)
-            elite = scored[:10]
+        for gen in range(self.generations):
+            if self.incremental:
+                live = {id(grid) for grid in population}
+                self._parents = {k: v for k, v in self._parents.items()
+                                 if k in live}
+                self._fields = {k: v for k, v in self._fields.items()
+                                if k in live}
+            with self.profiler.phase("ga.evaluate"):
+                scores = self._evaluate(population)
+            order = sorted(range(len(population)),
+                           key=scores.__getitem__, reverse=True)
+            scored = [population[i] for i in order]
+            elite = scored[:self.elite_size]
+            spread = diversity(elite)
+            self.trace.append(GenerationStats(
+                gen + 1, scores[order[0]], sum(scores) / len(scores), spread,
+                rate, immigrants, self.evaluations,
+                time.perf_counter() - start))
+            self.profiler.record("ga.generation", self.trace[-1].seconds - (
+                self.trace[-2].seconds if gen else 0.0))
             # Visualize all candidates in this generation if enabled
             if self.show_generations:
+                import pygame
                 for idx, candidate in enumerate(scored):
                     self.draw_grid(candidate)
                     pygame.display.set_caption(
-                        f"Generation {gen+1} - Candidate {idx+1}/30")
+                        f"Generation {gen+1} - Candidate {idx+1}/{len(scored)}")
                     pygame.event.pump()
                     time.sleep(0.01)
-            # Diversity injection: add 2 new random candidates each generation
+            if self.adaptive:
+                if best_score is None or scores[order[0]] > best_score:
+                    best_score = scores[order[0]]
+                    stale = 0
+                else:
+                    stale += 1
+                if stale >= self.patience or (
+                        self.time_budget is not None
+                        and time.perf_counter() - start >= self.time_budget):
+                    break
+                rate, immigrants = self._adapt(rate, immigrants, spread)
+            # Diversity injection: add new random candidates each generation
             new_randoms = []
-            for _ in range(2):
+            for _ in range(immigrants):
                 new_randoms.append(self._random_candidate())
             population = elite[:] + new_randoms
-            while len(population) < 30:
-                a, b = random.sample(elite, 2)
-                child = self._mutate(self._crossover(a, b), 0.03)
+            while len(population) < self.population_size:
+                a, b = self.rng.sample(elite, 2)
+                band = self._crossover_band()
+                flips = []
+                child = self._mutate(self._crossover(a, b, band), rate, flips)
+                if self.incremental:
+                    self._parents[id(child)] = (child, (a, b, band, flips))
                 population.append(child)
-        best = max(population, key=self._fitness)
-        for i in range(self.rows):
-            best[i][0] = 1
-            best[i][-1] = 1
-        for j in range(self.cols):
-            best[0][j] = 1
-            best[-1][j] = 1
-        best[1][1] = 0
-        best[self.rows-2][1] = 0
-        best[1][self.cols-2] = 0
-        best[self.rows-2][self.cols-2] = 0
-        return best
+        scores = self._evaluate(population)
+        self._parents = {}
+        self._fields = {}
+        best = bytearray(population[scores.index(max(scores))])
+        rows = self.rows
+        cols = self.cols
+        best[0:cols] = b"\x01" * cols
+        best[(rows - 1) * cols:] = b"\x01" * cols
+        best[0::cols] = b"\x01" * rows
+        best[cols - 1::cols] = b"\x01" * rows
+        for x, y in [(1, 1), (1, rows - 2), (cols - 2, 1),
+                     (cols - 2, rows - 2)]:
+            best[y * cols + x] = 0
+        return Grid(rows, cols, best)
+
+    def _adapt(self, rate, immigrants, spread):
+        if spread < self.DIVERSITY_TARGET:
+            rate = max(rate / 1.5, min(self.MIN_MUTATION_RATE,
+                                       self.mutation_rate))
+            immigrants = min(immigrants + 1,
+                             max(self.immigrants, self.population_size // 4))
+        else:
+            rate = min(rate * 1.5, self.mutation_rate)
+            immigrants = max(immigrants - 1, self.immigrants)
+        return rate, immigrants
+
+    def dump_trace(self, path):
+        # Convergence trace of the last run, as CSV or JSON by extension
+        with open(path, "w", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.writer(f)
+                writer.writerow(GenerationStats._fields)
+                writer.writerows(self.trace)
+            else:
+                json.dump([stats._asdict() for stats in self.trace], f,
+                          indent=1)
+
+    def cache_info(self):
+        return CacheInfo(self.cache_hits, self.cache_misses,
+                         self.cache_size, len(self._cache))
+
+    def cache_clear(self):
+        self._cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _evaluate(self, population):
+        seal = self.unreachable == "seal"
+        if self.cache_size <= 0:
+            if seal:
+                for grid in population:
+                    self._seal(grid)
+            return self._score(population)
+        scores = [None] * len(population)
+        pending = OrderedDict()
+        for i, grid in enumerate(population):
+            key = grid_key(grid)
+            # Cached candidates were sealed when they were first scored
+            if seal and key not in self._cache and self._seal(grid):
+                key = grid_key(grid)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                scores[i] = self._cache[key]
+                self.cache_hits += 1
+            elif key in pending:
+                # Duplicate inside this generation (e.g. a crossover child
+                # identical to its parent): score it once
+                pending[key].append(i)
+                self.cache_hits += 1
+            else:
+                pending[key] = [i]
+                self.cache_misses += 1
+        if pending:
+            fresh = self._score([population[idx[0]]
+                                for idx in pending.values()])
+            for (key, indices), score in zip(pending.items(), fresh):
+                for i in indices:
+                    scores[i] = score
+                self._cache[key] = score
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return scores
+
+    def _score(self, population):
+        self.evaluations += len(population)
+        if self._pool is not None:
+            size = -(-len(population) // self.workers)
+            futures = [
+                self._pool.submit(_score_chunk, self.rows, self.cols,
+                                  self.engine, population[i:i + size])
+                for i in range(0, len(population), size)
+            ]
+            return [score for future in futures for score in future.result()]
+        if self.engine == "numpy":
+            return self._batch_fitness(population)
+        if self.incremental:
+            return [self._incremental_fitness(grid) for grid in population]
+        return [self._fitness(grid) for grid in population]
+
+    def fitness(self, grid):
+        return self._fitness(as_grid(grid).cells)
+
+    def _corners(self):
+        return [
+            (1, self.rows - 2),
+            (self.cols - 2, 1),
+            (self.cols - 2, self.rows - 2)
+        ]
 
     def _fitness(self, grid):
-        if not self._solvable(grid):
-            return -1
+        reached, corner_dists = self._flood(grid)
+        return self._combine(reached, grid.count(0), grid.count(1),
+                             corner_dists)
+
+    def _combine(self, reached, total_open, walls, corner_dists):
+        if reached != total_open:
+            return _unsolvable_score(reached, total_open)
         # Normalize wall_score and path_score
         total_cells = self.rows * self.cols
-        wall_score = 1 - (sum(sum(row) for row in grid) / total_cells)
+        wall_score = 1 - (walls / total_cells)
         max_path = self.rows + self.cols
-        path_score = self._avg_path_length(grid) / max_path
+        path_score = (sum(corner_dists) / len(corner_dists)) / max_path
         return wall_score * 0.9 + path_score * 0.1
 
+    def _incremental_fitness(self, grid):
+        entry = self._parents.get(id(grid))
+        if entry is not None and entry[0] is grid:
+            field = self._repair(grid, *entry[1])
+        else:
+            field = self._full_levels(grid)
+        self._fields[id(grid)] = (grid, field)
+        return self._combine(field.reached, len(grid) - field.walls,
+                             field.walls, field.corners)
+
+    def _levels_for(self, grid):
+        entry = self._fields.get(id(grid))
+        if entry is not None and entry[0] is grid:
+            return entry[1]
+        field = self._full_levels(grid)
+        self._fields[id(grid)] = (grid, field)
+        return field
+
+    def _full_levels(self, grid):
+        self.full_floods += 1
+        start = 1 << (len(grid) - 1 - (self.cols + 1))
+        return self._spread(int(bytes(grid).translate(_OPEN_CHARS), 2),
+                            [start], start,
+                            [self.rows + self.cols] * len(self._corners()),
+                            grid.count(1))
+
+    def _spread(self, open_cells, levels, visited, corners, walls):
+        # Continues a bit-parallel BFS from levels[-1]. A level's neighbours
+        # are its shifts by one cell and by one row; the wall border keeps
+        # the shifts from wrapping, and masking with the open cells not yet
+        # visited leaves the next level. Same result as _flood.
+        cols = self.cols
+        last = self.rows * cols - 1
+        marks = [(1 << (last - (y * cols + x)), k)
+                 for k, (x, y) in enumerate(self._corners())]
+        unseen = open_cells & ~visited
+        frontier = levels[-1]
+        reused = len(levels)
+        while True:
+            frontier = ((frontier << 1) | (frontier >> 1) | (frontier << cols)
+                        | (frontier >> cols)) & unseen
+            if not frontier:
+                break
+            unseen ^= frontier
+            for bit, k in marks:
+                if frontier & bit:
+                    corners[k] = len(levels)
+            levels.append(frontier)
+        self.levels_flooded += len(levels) - reused
+        reached = sum(level.bit_count() for level in levels)
+        return FloodLevels(open_cells, levels, reached, walls, corners)
+
+    def _repair(self, grid, a, b, band, flips):
+        # grid is a copy of a with rows band[0]:band[1] taken from b and
+        # the cells in flips toggled. The BFS is repaired against the
+        # parent whose rows hold the start: its levels stay exact up to the
+        # first one that touches a changed cell or a neighbour of one, and
+        # only the levels after that are flooded again.
+        cols = self.cols
+        size = len(grid)
+        i1, i2 = band
+        base, other = (b, a) if i1 <= 1 < i2 else (a, b)
+        field = self._levels_for(base)
+        band_cells = ((1 << ((i2 - i1) * cols)) - 1) << (size - i2 * cols)
+        changed = field.open ^ self._levels_for(other).open
+        changed &= ~band_cells if base is b else band_cells
+        last = size - 1
+        for i in flips:
+            changed ^= 1 << (last - i)
+        open_cells = field.open ^ changed
+        opened = (changed & open_cells).bit_count()
+        walls = field.walls + changed.bit_count() - 2 * opened
+        near = (changed | (changed << 1) | (changed >> 1) | (changed << cols)
+                | (changed >> cols))
+        levels = field.levels
+        keep = 0
+        visited = levels[0]
+        while keep + 1 < len(levels) and not levels[keep] & near:
+            keep += 1
+            visited |= levels[keep]
+        self.repaired += 1
+        self.levels_reused += keep
+        corners = [d if d <= keep else self.rows + self.cols
+                   for d in field.corners]
+        return self._spread(open_cells, levels[:keep + 1], visited, corners,
+                            walls)
+
+    def _flood(self, grid):
+        # One BFS from (1, 1): how many cells it reaches (the start always
+        # counts) and the distance to each far corner, rows + cols when a
+        # corner is unreachable. Candidates always have a wall border, so
+        # flat index steps never leave the board.
+        cols = self.cols
+        start = cols + 1
+        seen = bytearray(len(grid))
+        seen[start] = 1
+        corners = {y * cols + x: k for k, (x, y) in enumerate(self._corners())}
+        dists = [self.rows + self.cols] * len(corners)
+        steps = (1, -1, cols, -cols)
+        frontier = [start]
+        reached = 1
+        level = 0
+        while frontier:
+            level += 1
+            grown = []
+            for i in frontier:
+                for step in steps:
+                    j = i + step
+                    if not grid[j] and not seen[j]:
+                        seen[j] = 1
+                        grown.append(j)
+                        if j in corners:
+                            dists[corners[j]] = level
+            reached += len(grown)
+            frontier = grown
+        return reached, dists
+
     def _solvable(self, grid):
-        total_open = sum(1 for row in grid for v in row if v == 0)
-        visited = {(1, 1)}
-        queue = deque([(1, 1)])
-        while queue:
-            x, y = queue.popleft()
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx = x + dx
-                ny = y + dy
-                if (
-                    0 <= nx < self.cols
-                    and 0 <= ny < self.rows
-                    and grid[ny][nx] == 0
-                    and (nx, ny) not in visited
-                ):
-                    visited.add((nx, ny))
-                    queue.append((nx, ny))
-        return len(visited) == total_open
+        return self._pockets(grid)[0] == 0
+
+    def _pockets(self, grid):
+        # Open cells outside the start's component, and the runs of open
+        # cells (see grid.component_runs) that hold them
+        runs, roots = component_runs(grid, self.cols)
+        start = self.cols + 1
+        root = next((roots[k] for k, (i, j) in enumerate(runs)
+                     if i <= start < j), -1)
+        pockets = [run for run, r in zip(runs, roots) if r != root]
+        return sum(j - i for i, j in pockets), pockets
+
+    def _seal(self, grid):
+        # Opens the start and walls up every open cell outside its
+        # component, in place. Returns how many cells were sealed.
+        opened = grid[self.cols + 1]
+        grid[self.cols + 1] = 0
+        sealed, pockets = self._pockets(grid)
+        for i, j in pockets:
+            grid[i:j] = b"\x01" * (j - i)
+        self.sealed += sealed
+        if opened or sealed:
+            # The band and flips recorded for a child no longer cover it
+            self._parents.pop(id(grid), None)
+        return sealed
 
     def _avg_path_length(self, grid):
-        def dist(dst):
-            visited = set([(1, 1)])
-            queue = deque([((1, 1), 0)])
-            while queue:
-                (x, y), d = queue.popleft()
-                if (x, y) == dst:
-                    return d
-                for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                    nx = x + dx
-                    ny = y + dy
-                    if (
-                        0 <= nx < self.cols
-                        and 0 <= ny < self.rows
-                        and grid[ny][nx] == 0
-                        and (nx, ny) not in visited
-                    ):
-                        visited.add((nx, ny))
-                        queue.append(((nx, ny), d + 1))
-            return self.rows + self.cols
-        corners = [
-            (1, self.rows - 2),
-            (self.cols - 2, 1),
-            (self.cols - 2, self.rows - 2)
-        ]
-        return sum(dist(corner) for corner in corners) / len(corners)
+        corner_dists = self._flood(grid)[1]
+        return sum(corner_dists) / len(corner_dists)
+
+    def _batch_fitness(self, population):
+        # Same scores as _fitness, but the connectivity flood and the three
+        # corner distances come out of one frontier expansion over the whole
+        # (population, rows, cols) array.
+        grids = np.frombuffer(b"".join(population), dtype=np.uint8).reshape(
+            len(population), self.rows, self.cols)
+        passable = grids == 0
+        visited = np.zeros_like(passable)
+        visited[:, 1, 1] = True
+        unvisited = passable & ~visited
+        frontier = visited.copy()
+        grown = np.empty_like(frontier)
+        corners = self._corners()
+        corner_x = [x for x, _ in corners]
+        corner_y = [y for _, y in corners]
+        dists = np.full((len(population), len(corners)),
+                        self.rows + self.cols, dtype=np.int64)
+        level = 0
+        while frontier.any():
+            level += 1
+            grown[:] = False
+            grown[:, 1:, :] |= frontier[:, :-1, :]
+            grown[:, :-1, :] |= frontier[:, 1:, :]
+            grown[:, :, 1:] |= frontier[:, :, :-1]
+            grown[:, :, :-1] |= frontier[:, :, 1:]
+            np.logical_and(grown, unvisited, out=frontier)
+            unvisited ^= frontier
+            visited |= frontier
+            dists[frontier[:, corner_y, corner_x]] = level
+        walls = grids.sum(axis=(1, 2), dtype=np.int64).tolist()
+        reached = visited.sum(axis=(1, 2)).tolist()
+        total_open = passable.sum(axis=(1, 2)).tolist()
+        return [self._combine(reached[i], total_open[i], walls[i], corner_dists)
+                for i, corner_dists in enumerate(dists.tolist())]
 
     def _random_candidate(self):
-        grid = []
-        for i in range(self.rows):
-            row = []
-            for j in range(self.cols):
-                if i == 0 or i == self.rows - 1 or j == 0 or j == self.cols - 1:
-                    row.append(1)
-                else:
-                    row.append(1 if random.random() < 0.25 else 0)
-            grid.append(row)
+        # Every inner cell is a wall with probability 1/4
+        rows = self.rows
+        cols = self.cols
+        grid = bytearray(self.rng.randbytes(rows * cols).translate(_WALL_QUARTER))
+        grid[0:cols] = b"\x01" * cols
+        grid[(rows - 1) * cols:] = b"\x01" * cols
+        grid[0::cols] = b"\x01" * rows
+        grid[cols - 1::cols] = b"\x01" * rows
         return grid
 
-    def _crossover(self, a, b):
-        i1, i2 = sorted(random.sample(range(1, self.rows - 1), 2))
-        child = [row[:] for row in a]
-        for i in range(i1, i2):
-            child[i] = b[i][:]
+    def _crossover_band(self):
+        return tuple(sorted(self.rng.sample(range(1, self.rows - 1), 2)))
+
+    def _crossover(self, a, b, band):
+        # A copy of a with the rows band[0]:band[1] taken from b
+        i1, i2 = band
+        child = bytearray(a)
+        child[i1 * self.cols:i2 * self.cols] = b[i1 * self.cols:i2 * self.cols]
         return child
 
-    def _mutate(self, grid, rate):
-        for i in range(1, self.rows - 1):
-            for j in range(1, self.cols - 1):
-                if random.random() < rate:
-                    grid[i][j] = 1 - grid[i][j]
-        return grid
+    def _mutate(self, grid, rate, flips=None):
+        # Flips each inner cell with probability rate, appending the flipped
+        # indices to flips if given. The gaps between flips are drawn from
+        # the geometric distribution, so the cost is proportional to the
+        # number of flips rather than the board size.
+        inner_cols = self.cols - 2
+        inner = (self.rows - 2) * inner_cols
+        if rate <= 0 or inner <= 0:
+            return grid
+        log_keep = math.log(1 - rate) if rate < 1 else -math.inf
+        k = -1
+        while True:
+            k += 1 + int(math.log(1.0 - self.rng.random()) / log_keep)
+            if k >= inner:
+                return grid
+            i = (1 + k // inner_cols) * self.cols + 1 + k % inner_cols
+            grid[i] ^= 1
+            if flips is not None:
+                flips.append(i)
+
+
+def _score_chunk(rows, cols, engine, chunk):
+    return MazeGenerator(rows, cols, engine=engine)._score(chunk)
+
+
+class PelletSet:
+    # Pellet positions as one byte per board cell plus a running count, so
+    # membership, eating and the "all eaten" check are O(1). Iteration is
+    # in row-major order.
+    def __init__(self, rows, cols, positions=()):
+        self.rows = rows
+        self.cols = cols
+        self.bits = bytearray(rows * cols)
+        self.count = 0
+        for pos in positions:
+            self.add(pos)
+
+    def _index(self, pos):
+        x, y = pos
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return y * self.cols + x
+        return -1
+
+    def __contains__(self, pos):
+        i = self._index(pos)
+        return i >= 0 and self.bits[i] == 1
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        bits = self.bits
+        cols = self.cols
+        i = bits.find(1)
+        while i >= 0:
+            yield (i % cols, i // cols)
+            i = bits.find(1, i + 1)
+
+    def __repr__(self):
+        return f"PelletSet({list(self)!r})"
+
+    @classmethod
+    def from_bits(cls, rows, cols, bits):
+        pellets = cls(rows, cols)
+        pellets.bits[:] = bits
+        pellets.count = pellets.bits.count(1)
+        return pellets
+
+    def add(self, pos):
+        i = self._index(pos)
+        if i < 0:
+            raise ValueError(f"{pos} is outside the board")
+        if not self.bits[i]:
+            self.bits[i] = 1
+            self.count += 1
+
+    def discard(self, pos):
+        # Returns whether a pellet was there to eat
+        i = self._index(pos)
+        if i >= 0 and self.bits[i]:
+            self.bits[i] = 0
+            self.count -= 1
+            return True
+        return False
+
+    def remove(self, pos):
+        if not self.discard(pos):
+            raise ValueError(f"no pellet at {pos}")
+
+
+class DistanceTable:
+    # All-pairs shortest path lengths and first steps between open cells.
+    # Both tables are flat n*n arrays indexed by src * n + dst, where n is
+    # the number of open cells. Tables built earlier (e.g. stored in a maze
+    # library) can be passed in to skip the BFS; any sequence of u16 values
+    # works, so memoryviews into a mapped file are used without copying.
+    UNREACHABLE = 0xFFFF
+
+    def __init__(self, grid, dist=None, next_hop=None):
+        grid = as_grid(grid)
+        rows = self.rows = grid.rows
+        cols = self.cols = grid.cols
+        size = rows * cols
+        positions = _positions.get((rows, cols))
+        if positions is None:
+            positions = _positions[(rows, cols)] = [
+                (i % cols, i // cols) for i in range(size)]
+        # The open cells are picked out at C level, so wrapping stored
+        # tables stays cheap
+        open_cells = list(compress(range(size),
+                                   grid.cells.translate(_OPEN_FLAGS)))
+        self.cells = list(map(positions.__getitem__, open_cells))
+        self.index = index = array("i", [-1]) * size
+        for k, i in enumerate(open_cells):
+            index[i] = k
+        n = len(self.cells)
+        self.size = n
+        if dist is not None:
+            if len(dist) != n * n or len(next_hop) != n * n:
+                raise ValueError("distance tables do not match the grid")
+            self.dist = dist
+            self.next_hop = next_hop
+            return
+        self.dist = array("H", [self.UNREACHABLE]) * (n * n)
+        self.next_hop = array("H", [self.UNREACHABLE]) * (n * n)
+        masks, steps = grid.neighbor_steps()
+        neighbors = []
+        for x, y in self.cells:
+            i = y * cols + x
+            neighbors.append([index[i + step] for step in steps[masks[i]]])
+        # One BFS per destination: the BFS parent of every cell is its
+        # first step towards that destination
+        dist = self.dist
+        next_hop = self.next_hop
+        for dst in range(n):
+            dist[dst * n + dst] = 0
+            next_hop[dst * n + dst] = dst
+            queue = [dst]
+            for cur in queue:
+                d = dist[cur * n + dst] + 1
+                for nb in neighbors[cur]:
+                    slot = nb * n + dst
+                    if dist[slot] == self.UNREACHABLE:
+                        dist[slot] = d
+                        next_hop[slot] = cur
+                        queue.append(nb)
+
+    def _slot(self, sx, sy, tx, ty):
+        if not (0 <= sx < self.cols and 0 <= sy < self.rows
+                and 0 <= tx < self.cols and 0 <= ty < self.rows):
+            return -1
+        src = self.index[sy * self.cols + sx]
+        dst = self.index[ty * self.cols + tx]
+        if src < 0 or dst < 0:
+            return -1
+        return src * self.size + dst
+
+    def distance(self, sx, sy, tx, ty):
+        slot = self._slot(sx, sy, tx, ty)
+        if slot < 0 or self.dist[slot] == self.UNREACHABLE:
+            return None
+        return self.dist[slot]
+
+    def next_step(self, sx, sy, tx, ty):
+        slot = self._slot(sx, sy, tx, ty)
+        if slot < 0 or self.dist[slot] in (0, self.UNREACHABLE):
+            return None
+        return self.cells[self.next_hop[slot]]
+
+    def path(self, sx, sy, tx, ty):
+        slot = self._slot(sx, sy, tx, ty)
+        if slot < 0 or self.dist[slot] == self.UNREACHABLE:
+            return []
+        n = self.size
+        dst = slot % n
+        cur = slot // n
+        path = []
+        while cur != dst:
+            cur = self.next_hop[cur * n + dst]
+            path.append(self.cells[cur])
+        return path
 
 
 class Maze:
-    def __init__(self, show_generations=False):
+    def __init__(self, show_generations=False, engine="python", workers=1,
+                 seed=None, distance_table=False, rng=random, rows=ROWS,
+                 cols=COLS, library=None, producer=None, **generator_options):
+        if library is not None:
+            rows, cols = library.rows, library.cols
+        elif producer is not None:
+            rows, cols = producer.rows, producer.cols
+        self.rows = rows
+        self.cols = cols
         self.generator = MazeGenerator(
-            ROWS, COLS, show_generations=show_generations)
+            rows, cols, show_generations=show_generations, engine=engine,
+            workers=workers, seed=seed, **generator_options)
         self.grid = None
-        self.pellets = []
-        self.power_pellets = []
+        self.pellets = PelletSet(rows, cols)
+        self.power_pellets = PelletSet(rows, cols)
+        self.use_distance_table = distance_table
+        self.rng = rng
+        self.library = library
+        self.producer = producer
+        self.distances = None
         self.generate_new_maze()
 
     def generate_new_maze(self):
-        # Show loading message before generating maze
-        from utils import screen, font, SCREEN_WIDTH, SCREEN_HEIGHT, BLACK, WHITE
-        import pygame
-        import time
-        screen.fill(BLACK)
-        loading_text = font.render("Generating Maze...", True, WHITE)
-        screen.blit(
-            loading_text,
-            (
-                SCREEN_WIDTH // 2 - loading_text.get_width() // 2,
-                SCREEN_HEIGHT // 2 - loading_text.get_height() // 2
-            )
-        )
-        pygame.display.flip()
+        if self.library is not None and len(self.library):
+            # A pre-generated maze with its pellets and distances
+            record = self.library.pick(self.rng)
+            self._use_pregenerated(record.grid, record.distances,
+                                   record.power_pellets)
+            return
+        if self.producer is not None:
+            # Usually already generated in the background during last game
+            self._use_pregenerated(*self.producer.take())
+            return
         self.grid = self.generator.generate_maze()
-        pygame.display.set_caption("Pac-Man with AI")
         self.init_pellets()
+        self.distances = None
+        # The table needs two bytes per pair of open cells, so it is only
+        # built for boards around the default size
+        if (self.use_distance_table
+                and self.grid.count_open() <= MAX_TABLE_CELLS):
+            self.distances = DistanceTable(self.grid)
+
+    def _use_pregenerated(self, grid, distances, power_cells=None):
+        self.grid = grid
+        self.init_pellets(power_cells)
+        self.distances = distances if self.use_distance_table else None
+        if (self.use_distance_table and self.distances is None
+                and grid.count_open() <= MAX_TABLE_CELLS):
+            self.distances = DistanceTable(grid)
 
-    def init_pellets(self):
-        self.pellets = []
-        for y in range(ROWS):
-            for x in range(COLS):
-                if self.grid[y][x] == 0 and (x, y) != (1, 1):
-                    self.pellets.append((x, y))
-        # Remove unreachable pellets
-        reachable = {(1, 1)}
-        queue = deque([(1, 1)])
-        while queue:
-            x, y = queue.popleft()
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                nx = x + dx
-                ny = y + dy
-                if (
-                    (nx, ny) not in reachable
-                    and 0 <= nx < COLS
-                    and 0 <= ny < ROWS
-                    and self.grid[ny][nx] == 0
-                ):
-                    reachable.add((nx, ny))
-                    queue.append((nx, ny))
-        self.pellets = [p for p in self.pellets if p in reachable]
-        # random power-pellets from reachable cells
-        power_candidates = [p for p in reachable if p != (1, 1)]
-        count = min(4, len(power_candidates))
-        self.power_pellets = random.sample(power_candidates, count)
-        for p in self.power_pellets:
-            if p in self.pellets:
-                self.pellets.remove(p)
+    def init_pellets(self, power_cells=None):
+        # Only cells reachable from Pac-Man's start get pellets.
+        # power_cells are flat cell indices; random ones are picked if None
+        reachable, _ = self.grid.reachable(1, 1)
+        reachable[self.cols + 1] = 0
+        if power_cells is None:
+            # random power-pellets from reachable cells
+            power_candidates = [i for i, cell in enumerate(reachable) if cell]
+            count = min(4, len(power_candidates))
+            power_cells = self.rng.sample(power_candidates, count)
+        power = bytearray(len(reachable))
+        for i in power_cells:
+            power[i] = 1
+            reachable[i] = 0
+        self.power_pellets = PelletSet.from_bits(self.rows, self.cols, power)
+        self.pellets = PelletSet.from_bits(self.rows, self.cols, reachable)
 
     def draw(self):
-        for row in range(ROWS):
-            for col in range(COLS):
-                if self.grid[row][col] == 1:
+        from utils import screen, SPRITES
+        for row in range(min(self.rows, VIEW_ROWS)):
+            for col in range(min(self.cols, VIEW_COLS)):
+                if not self.grid.is_open(col, row):
                     screen.blit(SPRITES["wall"],
                                 (col * TILE_SIZE, row * TILE_SIZE))
         for x, y in self.pellets:
-            screen.blit(SPRITES["pellet"], (x * TILE_SIZE, y * TILE_SIZE))
+            if x < VIEW_COLS and y < VIEW_ROWS:
+                screen.blit(SPRITES["pellet"], (x * TILE_SIZE, y * TILE_SIZE))
         for x, y in self.power_pellets:
-            screen.blit(SPRITES["power_pellet"],
-                        (x * TILE_SIZE, y * TILE_SIZE))
+            if x < VIEW_COLS and y < VIEW_ROWS:
+                screen.blit(SPRITES["power_pellet"],
+                            (x * TILE_SIZE, y * TILE_SIZE))
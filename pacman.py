@@ -1,5 +1,4 @@
-from utils import YELLOW, SPRITES, TILE_SIZE, screen, font, SCREEN_WIDTH, SCREEN_HEIGHT, WHITE, CYAN, ROWS, COLS
-import time
+from utils import YELLOW, TILE_SIZE, SCREEN_WIDTH, WHITE, CYAN, FPS, POWER_DURATION
 
 
 class PacMan:
@@ -12,23 +11,18 @@ class PacMan:
         self.power_time = 0
         self.lives = 3
 
-    def move(self, dx, dy, maze):
+    def move(self, dx, dy, maze, now=0):
+        # now is the current game tick; it stamps the start of a power-up
         new_x = self.x + dx
         new_y = self.y + dy
-        if (
-            0 <= new_x < COLS
-            and 0 <= new_y < ROWS
-            and maze.grid[new_y][new_x] == 0
-        ):
+        if maze.grid.is_open(new_x, new_y):
             self.x = new_x
             self.y = new_y
-            if (self.x, self.y) in maze.pellets:
-                maze.pellets.remove((self.x, self.y))
+            if maze.pellets.discard((self.x, self.y)):
                 self.score += 10
-            if (self.x, self.y) in maze.power_pellets:
-                maze.power_pellets.remove((self.x, self.y))
+            if maze.power_pellets.discard((self.x, self.y)):
                 self.powered_up = True
-                self.power_time = time.time()
+                self.power_time = now
                 self.score += 50
                 return "power"
             if not maze.pellets and not maze.power_pellets:
@@ -36,11 +30,21 @@ class PacMan:
             return "moved"
         return "blocked"
 
-    def draw(self):
+    def draw(self, origin=(0, 0), screen=None):
+        # screen defaults to the window
+        import utils
+        from utils import SPRITES
+        if screen is None:
+            screen = utils.screen
         pacman_sprite = SPRITES["pacman"]
-        screen.blit(pacman_sprite, (self.x * TILE_SIZE, self.y * TILE_SIZE))
+        screen.blit(pacman_sprite, ((self.x - origin[0]) * TILE_SIZE,
+                                    (self.y - origin[1]) * TILE_SIZE))
 
-    def draw_hud(self):
+    def draw_hud(self, now=0, power_duration=POWER_DURATION, screen=None):
+        import utils
+        from utils import font
+        if screen is None:
+            screen = utils.screen
         score_text = font.render(f"Score: {self.score}", True, WHITE)
         lives_text = font.render(f"Lives: {self.lives}", True, WHITE)
         screen.blit(score_text, (10, 10))
@@ -49,7 +53,8 @@ class PacMan:
             (SCREEN_WIDTH - lives_text.get_width() - 10, 10)
         )
         if self.powered_up:
-            time_left = max(0, int(10 - (time.time() - self.power_time)))
+            ticks_left = power_duration - (now - self.power_time)
+            time_left = max(0, int(ticks_left / FPS))
             power_text = font.render(f"Power: {time_left}s", True, CYAN)
             screen.blit(
                 power_text,
@@ -57,20 +62,24 @@ class PacMan:
             )
 
     def handle_collisions(self, ghosts, maze):
+        events = []
         for ghost in ghosts:
             if ghost.x == self.x and ghost.y == self.y:
                 if ghost.is_scared and not ghost.ate_during_power:
                     ghost.reset_position()
                     self.score += 200
+                    events.append(("ghost_eaten", ghost.name))
                 else:
                     self.lives -= 1
+                    events.append(("caught", ghost.name))
                     if self.lives > 0:
                         self.reset_after_death(ghosts)
+                        events.append(("death", ghost.name))
                     break
+        return events
 
-    def handle_powerup_expiration(self, ghosts, power_duration):
-        import time
-        if self.powered_up and (time.time() - self.power_time > power_duration):
+    def handle_powerup_expiration(self, ghosts, power_duration, now):
+        if self.powered_up and (now - self.power_time > power_duration):
             self.powered_up = False
             for ghost in ghosts:
                 ghost.is_scared = False
@@ -87,6 +96,3 @@ class PacMan:
             ghost.just_respawned = False
             ghost.ate_during_power = False
             ghost.is_scared = False
-        import pygame
-        pygame.display.flip()
-        time.sleep(1)
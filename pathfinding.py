@@ -0,0 +1,403 @@
+import heapq
+from array import array
+from grid import as_grid
+
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+class GridSearch:
+    # Shortest-path searches over a rows x cols grid that keep their
+    # bookkeeping in flat arrays indexed by y * cols + x. The arrays are
+    # reused between calls; a per-search stamp marks which entries are
+    # current, so nothing has to be cleared or allocated per search.
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        size = rows * cols
+        self.parent = array("i", [-1]) * size
+        self.cost = array("i", [0]) * size
+        self.seen = array("I", [0]) * size
+        self.closed = array("I", [0]) * size
+        self.stamp = 0
+        self.heap = []
+        self.queue = []
+        self._grid = None
+        self._neighbors = None
+        # Cells taken off the open list by a_star and dijkstra, all calls
+        self.expanded = 0
+
+    def _neighbors_for(self, grid):
+        # Maze grids are not edited after generation, so the neighbour masks
+        # are looked up again only when a different grid object is searched
+        if grid is not self._grid:
+            self._neighbors = as_grid(grid).neighbor_steps()
+            self._grid = grid
+        return self._neighbors
+
+    def _begin(self):
+        self.stamp += 1
+        if self.stamp > 0xFFFFFFFF:
+            size = self.rows * self.cols
+            self.seen = array("I", [0]) * size
+            self.closed = array("I", [0]) * size
+            self.stamp = 1
+        return self.stamp
+
+    def _path(self, start, goal):
+        cols = self.cols
+        parent = self.parent
+        path = []
+        i = goal
+        while i != start:
+            path.append((i % cols, i // cols))
+            i = parent[i]
+        path.reverse()
+        return path
+
+    def _precedes(self, a, b):
+        # True when the path ending at a sorts before the equally long path
+        # ending at b, i.e. the order in which the old path-carrying heap
+        # entries would have been popped.
+        parent = self.parent
+        while True:
+            pa = parent[a]
+            pb = parent[b]
+            if pa == pb:
+                cols = self.cols
+                return (a % cols, a // cols) < (b % cols, b // cols)
+            a = pa
+            b = pb
+
+    def a_star(self, grid, sx, sy, tx, ty):
+        return self._best_first(grid, sx, sy, tx, ty, True)
+
+    def dijkstra(self, grid, sx, sy, tx, ty):
+        return self._best_first(grid, sx, sy, tx, ty, False)
+
+    def _best_first(self, grid, sx, sy, tx, ty, heuristic):
+        rows = self.rows
+        cols = self.cols
+        masks, steps = self._neighbors_for(grid)
+        stamp = self._begin()
+        parent = self.parent
+        cost = self.cost
+        seen = self.seen
+        closed = self.closed
+        start = sy * cols + sx
+        goal = ty * cols + tx
+        seen[start] = stamp
+        cost[start] = 0
+        parent[start] = -1
+        heap = self.heap
+        heap.clear()
+        h = abs(sx - tx) + abs(sy - ty) if heuristic else 0
+        # Heap entries keep the old (f, g, position) order, with the (x, y)
+        # tuple packed into the single int x * rows + y
+        heap.append((h, 0, sx * rows + sy))
+        while heap:
+            _, g, key = heapq.heappop(heap)
+            i = (key % rows) * cols + key // rows
+            if i == goal:
+                return self._path(start, goal)
+            if closed[i] == stamp:
+                continue
+            closed[i] = stamp
+            self.expanded += 1
+            ng = g + 1
+            for step in steps[masks[i]]:
+                j = i + step
+                if closed[j] == stamp:
+                    continue
+                if seen[j] != stamp or ng < cost[j]:
+                    seen[j] = stamp
+                    cost[j] = ng
+                    parent[j] = i
+                    nx = j % cols
+                    ny = j // cols
+                    if heuristic:
+                        h = abs(nx - tx) + abs(ny - ty)
+                    heapq.heappush(heap, (ng + h, ng, nx * rows + ny))
+                elif ng == cost[j] and self._precedes(i, parent[j]):
+                    parent[j] = i
+        return []
+
+    def bfs(self, grid, sx, sy, tx, ty):
+        cols = self.cols
+        masks, steps = self._neighbors_for(grid)
+        stamp = self._begin()
+        parent = self.parent
+        seen = self.seen
+        start = sy * cols + sx
+        goal = ty * cols + tx
+        seen[start] = stamp
+        parent[start] = -1
+        queue = self.queue
+        queue.clear()
+        queue.append(start)
+        for i in queue:
+            if i == goal:
+                return self._path(start, goal)
+            for step in steps[masks[i]]:
+                j = i + step
+                if seen[j] != stamp:
+                    seen[j] = stamp
+                    parent[j] = i
+                    queue.append(j)
+        return []
+
+
+class PursuitField:
+    # Distance from every open cell to one target (Pac-Man), from a single
+    # reverse BFS. All chasing ghosts read their next step from the same
+    # field, which is rebuilt only when the target or the grid changes.
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        size = rows * cols
+        self.dist = array("i", [0]) * size
+        self.seen = array("I", [0]) * size
+        self.stamp = 0
+        self.target = None
+        self.builds = 0
+        self._grid = None
+        self._neighbors = None
+
+    def update(self, grid, tx, ty):
+        if grid is not self._grid:
+            self._neighbors = as_grid(grid).neighbor_steps()
+            self._grid = grid
+            self.target = None
+        if self.target == (tx, ty):
+            return False
+        self.target = (tx, ty)
+        self.builds += 1
+        self.stamp += 1
+        if self.stamp > 0xFFFFFFFF:
+            self.seen = array("I", [0]) * (self.rows * self.cols)
+            self.stamp = 1
+        stamp = self.stamp
+        dist = self.dist
+        seen = self.seen
+        masks, steps = self._neighbors
+        goal = ty * self.cols + tx
+        seen[goal] = stamp
+        dist[goal] = 0
+        queue = [goal]
+        for i in queue:
+            d = dist[i] + 1
+            for step in steps[masks[i]]:
+                j = i + step
+                if seen[j] != stamp:
+                    seen[j] = stamp
+                    dist[j] = d
+                    queue.append(j)
+        return True
+
+    def distance(self, x, y):
+        i = y * self.cols + x
+        if self.seen[i] != self.stamp:
+            return None
+        return self.dist[i]
+
+    def path(self, x, y, by_position=True):
+        # Walks downhill to the target. by_position picks the smallest (x, y)
+        # among equally good steps, which gives the same path as
+        # GridSearch.dijkstra and a_star; otherwise the first step in
+        # DIRECTIONS order wins, which gives the path GridSearch.bfs finds.
+        rows = self.rows
+        cols = self.cols
+        dist = self.dist
+        seen = self.seen
+        stamp = self.stamp
+        i = y * cols + x
+        if seen[i] != stamp:
+            return []
+        masks, steps = self._neighbors
+        path = []
+        d = dist[i]
+        while d > 0:
+            d -= 1
+            best = -1
+            for step in steps[masks[i]]:
+                j = i + step
+                if seen[j] == stamp and dist[j] == d:
+                    if not by_position:
+                        best = j
+                        break
+                    if best < 0 or ((j % cols) * rows + j // cols
+                                    < (best % cols) * rows + best // cols):
+                        best = j
+            i = best
+            path.append((i % cols, i // cols))
+        return path
+
+
+class IncrementalPlanner:
+    # Fringe-retrieving A* for one ghost chasing Pac-Man. The search tree is
+    # rooted at the ghost, and its expanded cells, their distances g and
+    # parents are kept in flat arrays across calls. A target that is still
+    # inside the expanded region needs no search at all, its path is read
+    # off the parent links; one that left it is reached by continuing the
+    # old search from its open list, re-keyed for the new target. When the
+    # ghost steps to a cell of the tree, the subtree below that cell keeps
+    # exact distances, so only the rest is dropped and the open list is
+    # rebuilt from the subtree's fringe. A new grid, or a ghost that jumped
+    # (respawn, reset after a death), starts a fresh search. With
+    # heuristic=False this is Dijkstra.
+    def __init__(self, rows, cols, heuristic=True):
+        self.rows = rows
+        self.cols = cols
+        self.heuristic = heuristic
+        size = rows * cols
+        self.g = array("i", [0]) * size
+        self.parent = array("i", [-1]) * size
+        self.closed = array("I", [0]) * size
+        self.stamp = 0
+        self._grid = None
+        self._neighbors = None
+        self.root = None
+        self.target = None
+        # Expanded cells in expansion order, so parents precede children
+        self.order = []
+        self.open = {}
+        self.heap = []
+        # Cells taken off the open list and fresh searches, all calls
+        self.expanded = 0
+        self.resets = 0
+
+    def _begin(self):
+        self.stamp += 1
+        if self.stamp > 0xFFFFFFFF:
+            self.closed = array("I", [0]) * (self.rows * self.cols)
+            self.stamp = 1
+        return self.stamp
+
+    def _reset(self, root):
+        self.resets += 1
+        self._begin()
+        self.root = root
+        self.parent[root] = -1
+        self.order = []
+        self.open = {root: 0}
+
+    def _reroot(self, root):
+        # Keep the subtree below the ghost's new cell, with distances
+        # measured from it, and collect its fringe as the open list
+        closed = self.closed
+        parent = self.parent
+        g = self.g
+        old = self.stamp
+        stamp = self._begin()
+        offset = g[root]
+        closed[root] = stamp
+        parent[root] = -1
+        order = []
+        for i in self.order:
+            if i == root or (closed[i] == old and closed[parent[i]] == stamp):
+                closed[i] = stamp
+                g[i] -= offset
+                order.append(i)
+        masks, steps = self._neighbors
+        fringe = {}
+        for i in order:
+            d = g[i] + 1
+            for step in steps[masks[i]]:
+                j = i + step
+                if closed[j] != stamp and d < fringe.get(j, d + 1):
+                    fringe[j] = d
+                    parent[j] = i
+        self.root = root
+        self.order = order
+        self.open = fringe
+
+    def _rekey(self, target):
+        # Order the open list by f = g + h for the current target; the
+        # larger g goes first among equal f
+        cols = self.cols
+        if self.heuristic:
+            tx, ty = target % cols, target // cols
+            self.heap = [(d + abs(i % cols - tx) + abs(i // cols - ty), -d, i)
+                         for i, d in self.open.items()]
+        else:
+            self.heap = [(d, -d, i) for i, d in self.open.items()]
+        heapq.heapify(self.heap)
+        self.target = target
+
+    def _search(self, target):
+        masks, steps = self._neighbors
+        closed = self.closed
+        parent = self.parent
+        g = self.g
+        stamp = self.stamp
+        open_g = self.open
+        heap = self.heap
+        order = self.order
+        cols = self.cols
+        heuristic = self.heuristic
+        tx, ty = target % cols, target // cols
+        while heap:
+            _, neg, i = heapq.heappop(heap)
+            if closed[i] == stamp or open_g.get(i) != -neg:
+                continue
+            del open_g[i]
+            closed[i] = stamp
+            g[i] = d = -neg
+            order.append(i)
+            self.expanded += 1
+            # The target is expanded like any other cell, so the open list
+            # stays the fringe of the closed region for the next call
+            d += 1
+            for step in steps[masks[i]]:
+                j = i + step
+                if closed[j] == stamp or d >= open_g.get(j, d + 1):
+                    continue
+                open_g[j] = d
+                parent[j] = i
+                f = d
+                if heuristic:
+                    f += abs(j % cols - tx) + abs(j // cols - ty)
+                heapq.heappush(heap, (f, -d, j))
+            if i == target:
+                return True
+        return False
+
+    def path(self, grid, sx, sy, tx, ty):
+        # Shortest path from the ghost at (sx, sy) to (tx, ty), excluding
+        # the ghost's cell
+        cols = self.cols
+        root = sy * cols + sx
+        target = ty * cols + tx
+        if grid is not self._grid:
+            self._neighbors = as_grid(grid).neighbor_steps()
+            self._grid = grid
+            self.root = None
+        if root != self.root:
+            if self.root is not None and self.closed[root] == self.stamp:
+                self._reroot(root)
+            else:
+                self._reset(root)
+            self.target = None
+        if self.closed[target] != self.stamp:
+            if target != self.target:
+                self._rekey(target)
+            if not self._search(target):
+                return []
+        parent = self.parent
+        path = []
+        i = target
+        while i != root:
+            path.append((i % cols, i // cols))
+            i = parent[i]
+        path.reverse()
+        return path
+
+
+_searches = {}
+
+
+def grid_search(rows, cols):
+    # One shared set of buffers per board size
+    search = _searches.get((rows, cols))
+    if search is None:
+        search = _searches[(rows, cols)] = GridSearch(rows, cols)
+    return search
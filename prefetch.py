@@ -0,0 +1,81 @@
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from maze import MazeGenerator, DistanceTable, MAX_TABLE_CELLS
+from utils import ROWS, COLS
+
+
+def produce_maze(seed, rows, cols, distance_table, generator_options):
+    # Runs in the background process; returns the grid, its distance table
+    # (or None) and how long they took to build
+    start = time.perf_counter()
+    grid = MazeGenerator(rows, cols, seed=seed,
+                         **generator_options).generate_maze()
+    distances = None
+    if distance_table and grid.count_open() <= MAX_TABLE_CELLS:
+        distances = DistanceTable(grid)
+    return grid, distances, time.perf_counter() - start
+
+
+class MazeProducer:
+    # Keeps up to depth mazes generating in a background process while the
+    # current game is played, so a restart can take one that is already
+    # done. take() falls back to generating in the calling process when
+    # nothing is queued or the background process has failed.
+    def __init__(self, rows=ROWS, cols=COLS, depth=2, seed=None,
+                 distance_table=False, **generator_options):
+        self.rows = rows
+        self.cols = cols
+        self.depth = depth
+        self.distance_table = distance_table
+        self.generator_options = generator_options
+        self.rng = random.Random(seed)
+        self.pending = deque()
+        self.pool = None
+        self.last_wait = 0.0
+        self.last_saved = 0.0
+        self.total_saved = 0.0
+        self.ready_takes = 0
+        self.sync_takes = 0
+
+    def _args(self):
+        return (self.rng.getrandbits(32), self.rows, self.cols,
+                self.distance_table, self.generator_options)
+
+    def fill(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=1)
+        while len(self.pending) < self.depth:
+            self.pending.append(self.pool.submit(produce_maze, *self._args()))
+
+    def take(self):
+        start = time.perf_counter()
+        result = None
+        while self.pending and result is None:
+            future = self.pending.popleft()
+            try:
+                result = future.result()
+            except Exception:
+                self.pending.clear()
+                self.close()
+        if result is None:
+            result = produce_maze(*self._args())
+            self.sync_takes += 1
+        else:
+            self.ready_takes += 1
+        grid, distances, built = result
+        self.last_wait = time.perf_counter() - start
+        self.last_saved = max(0.0, built - self.last_wait)
+        self.total_saved += self.last_saved
+        try:
+            self.fill()
+        except Exception:
+            self.close()
+        return grid, distances
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,124 @@
+import csv
+import json
+import time
+from collections import deque, namedtuple
+
+PhaseStats = namedtuple(
+    "PhaseStats", ["phase", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms",
+                   "max_ms"])
+
+
+class _Timer:
+    __slots__ = ("samples", "start")
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.samples.append(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    # Wall-clock timings of named phases, each kept in a ring buffer of the
+    # last size samples:
+    #     with profiler.phase("ghosts"):
+    #         ...
+    # or, for consecutive phases of one function, mark() followed by a
+    # lap(name) at the end of each phase. A disabled profiler hands out one
+    # shared no-op timer and returns from mark/lap at once, so leaving the
+    # calls in hot loops costs next to nothing. A phase's timer is reused
+    # between calls, so the same phase must not be nested in itself.
+    def __init__(self, enabled=True, size=1024):
+        self.enabled = enabled
+        self.size = size
+        self._samples = {}
+        self._timers = {}
+        self._mark = 0.0
+
+    def phase(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _Timer(self._series(name))
+        return timer
+
+    def mark(self):
+        if self.enabled:
+            self._mark = time.perf_counter()
+
+    def lap(self, name):
+        # Records the time since the last mark or lap as name
+        if self.enabled:
+            now = time.perf_counter()
+            self._series(name).append(now - self._mark)
+            self._mark = now
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self._series(name).append(seconds)
+
+    def _series(self, name):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.size)
+        return samples
+
+    def clear(self):
+        for samples in self._samples.values():
+            samples.clear()
+
+    def stats(self):
+        # Percentiles (nearest rank) per phase, in the order phases were
+        # first seen
+        result = []
+        for name, samples in self._samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            n = len(ordered)
+
+            def rank(p):
+                return ordered[min(n - 1, max(0, -(-p * n // 100) - 1))] * 1000
+            result.append(PhaseStats(name, n, sum(ordered) / n * 1000,
+                                     rank(50), rank(95), rank(99),
+                                     ordered[-1] * 1000))
+        return result
+
+    def report(self):
+        # One text line per phase, e.g. for an overlay or the console
+        return [f"{s.phase:<16} p50 {s.p50_ms:6.2f} p95 {s.p95_ms:6.2f} "
+                f"p99 {s.p99_ms:6.2f} ms" for s in self.stats()]
+
+    def dump(self, path):
+        # Phase statistics as CSV or JSON by extension
+        with open(path, "w", newline="") as f:
+            if path.endswith(".csv"):
+                writer = csv.writer(f)
+                writer.writerow(PhaseStats._fields)
+                writer.writerows(self.stats())
+            else:
+                json.dump([s._asdict() for s in self.stats()], f, indent=1)
+
+
+# Default for everything that takes an optional profiler
+NULL_PROFILER = Profiler(enabled=False)
@@ -0,0 +1,217 @@
+import pygame
+from profiler import NULL_PROFILER
+from utils import TILE_SIZE, FPS, BLACK, WHITE, RED, BLUE, PINK, ORANGE, SCREEN_WIDTH, SCREEN_HEIGHT, VIEW_ROWS, VIEW_COLS
+
+GHOST_PATH_COLORS = [RED, BLUE, PINK, ORANGE]
+# The view recenters on Pac-Man when he gets this close to its edge
+SCROLL_MARGIN = 4
+
+
+def tile_rect(x, y):
+    return pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+
+
+class Renderer:
+    # Draws a GameState while only pushing the parts of the window that
+    # changed. Walls are rendered once per maze into a cached layer; the
+    # background (walls + remaining pellets) is patched as pellets are
+    # eaten, and actors, ghost paths and the HUD are redrawn on top of it.
+    # Boards larger than the window are shown through a VIEW_COLS x
+    # VIEW_ROWS viewport whose top-left board cell is origin; moving it
+    # rebuilds the layers for the newly visible cells only.
+    def __init__(self, screen, sprites, font, profiler=NULL_PROFILER):
+        self.screen = screen
+        self.profiler = profiler
+        self.sprites = sprites
+        self.font = font
+        self.wall_layer = None
+        self.background = None
+        self.origin = (0, 0)
+        self._layer_key = None
+        self._pellets = set()
+        self._pellet_count = 0
+        self._previous = []
+        self._hud_key = None
+        self.screen_rect = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.hud_rect = pygame.Rect(
+            0, 0, SCREEN_WIDTH, font.get_linesize() + 10)
+
+    def _centered_origin(self, maze, x, y):
+        ox = min(max(x - VIEW_COLS // 2, 0), max(maze.cols - VIEW_COLS, 0))
+        oy = min(max(y - VIEW_ROWS // 2, 0), max(maze.rows - VIEW_ROWS, 0))
+        return (ox, oy)
+
+    def _needs_scroll(self, maze, x, y):
+        ox, oy = self.origin
+        near_edge = (x - ox < SCROLL_MARGIN or ox + VIEW_COLS - x <= SCROLL_MARGIN
+                     or y - oy < SCROLL_MARGIN
+                     or oy + VIEW_ROWS - y <= SCROLL_MARGIN)
+        return near_edge and self._centered_origin(maze, x, y) != self.origin
+
+    def _in_view(self, x, y):
+        ox, oy = self.origin
+        return ox <= x < ox + VIEW_COLS and oy <= y < oy + VIEW_ROWS
+
+    def _tile_rect(self, x, y):
+        return tile_rect(x - self.origin[0], y - self.origin[1])
+
+    def _build_wall_layer(self, grid):
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        layer.fill(BLACK)
+        wall = self.sprites["wall"]
+        ox, oy = self.origin
+        for row in range(oy, min(oy + VIEW_ROWS, grid.rows)):
+            for col in range(ox, min(ox + VIEW_COLS, grid.cols)):
+                if not grid.is_open(col, row):
+                    layer.blit(wall, self._tile_rect(col, row))
+        return layer
+
+    def _visible_pellets(self, pellets):
+        ox, oy = self.origin
+        return [(x, y) for y in range(oy, oy + VIEW_ROWS)
+                for x in range(ox, ox + VIEW_COLS) if (x, y) in pellets]
+
+    def reset(self, state):
+        # Full redraw, e.g. for a new maze or after another screen was shown
+        self._rebuild(state)
+        self.draw(state, False, update=False)
+        pygame.display.flip()
+
+    def _rebuild(self, state):
+        # Recenters the view on Pac-Man and repaints the whole background
+        maze = state.maze
+        self.origin = self._centered_origin(maze, state.pacman.x,
+                                            state.pacman.y)
+        if (maze.grid, self.origin) != self._layer_key:
+            self.wall_layer = self._build_wall_layer(maze.grid)
+            self._layer_key = (maze.grid, self.origin)
+        self.background = self.wall_layer.copy()
+        pellets = self._visible_pellets(maze.pellets)
+        power_pellets = self._visible_pellets(maze.power_pellets)
+        for x, y in pellets:
+            self.background.blit(self.sprites["pellet"], self._tile_rect(x, y))
+        for x, y in power_pellets:
+            self.background.blit(self.sprites["power_pellet"],
+                                 self._tile_rect(x, y))
+        self._pellets = set(pellets) | set(power_pellets)
+        self._pellet_count = len(maze.pellets) + len(maze.power_pellets)
+        self.screen.blit(self.background, (0, 0))
+        self._previous = []
+        self._hud_key = None
+
+    def _eaten_pellets(self, maze):
+        # Only pellets inside the view are tracked; the board-wide count
+        # tells whether any of them can have changed
+        count = len(maze.pellets) + len(maze.power_pellets)
+        if count == self._pellet_count:
+            return []
+        self._pellet_count = count
+        eaten = {p for p in self._pellets
+                 if p not in maze.pellets and p not in maze.power_pellets}
+        self._pellets -= eaten
+        return eaten
+
+    def _hud_state(self, state):
+        pacman = state.pacman
+        time_left = None
+        if pacman.powered_up:
+            ticks_left = state.power_duration - (state.tick - pacman.power_time)
+            time_left = max(0, int(ticks_left / FPS))
+        return (pacman.score, pacman.lives, time_left)
+
+    def draw(self, state, show_ghost_paths, update=True):
+        profiler = self.profiler
+        profiler.mark()
+        pacman = state.pacman
+        scrolled = self._needs_scroll(state.maze, pacman.x, pacman.y)
+        if scrolled:
+            self._rebuild(state)
+        screen = self.screen
+        background = self.background
+        ghosts = state.ghosts
+        ox, oy = self.origin
+
+        dirty = list(self._previous)
+        for x, y in self._eaten_pellets(state.maze):
+            rect = self._tile_rect(x, y)
+            background.blit(self.wall_layer, rect, rect)
+            dirty.append(rect)
+        profiler.lap("render.layers")
+
+        ghost_distances = [
+            ((ghost.x - pacman.x) ** 2 + (ghost.y - pacman.y) ** 2)
+            for ghost in ghosts
+        ]
+        closest_idx = ghost_distances.index(min(ghost_distances))
+        draw_order = [i for i in range(
+            len(ghosts)) if i != closest_idx] + [closest_idx]
+        paths = {}
+        drawn = [self._tile_rect(pacman.x, pacman.y)]
+        visible = [i for i in draw_order
+                   if self._in_view(ghosts[i].x, ghosts[i].y)]
+        for ghost_idx in draw_order:
+            ghost = ghosts[ghost_idx]
+            if show_ghost_paths and ghost.visual_path:
+                points = [
+                    ((gx - ox) * TILE_SIZE + TILE_SIZE // 2,
+                     (gy - oy) * TILE_SIZE + TILE_SIZE // 2)
+                    for gx, gy in [(ghost.x, ghost.y)] + ghost.visual_path
+                ]
+                xs = [px for px, _ in points]
+                ys = [py for _, py in points]
+                rect = pygame.Rect(
+                    min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)
+                ).inflate(6, 6).clip(self.screen_rect)
+                if rect:
+                    paths[ghost_idx] = points
+                    drawn.append(rect)
+            if ghost_idx in visible:
+                drawn.append(self._tile_rect(ghost.x, ghost.y))
+        profiler.lap("render.order")
+
+        # Restore whatever changed or was covered last frame, then draw the
+        # actors on top; the HUD strip is only redrawn when its text
+        # changes or something moved across it
+        hud_key = self._hud_state(state)
+        redraw_hud = (hud_key != self._hud_key
+                      or self.hud_rect.collidelist(dirty + drawn) != -1)
+        if redraw_hud:
+            dirty.append(self.hud_rect)
+        for rect in dirty:
+            screen.blit(background, rect, rect)
+
+        pacman.draw(self.origin, screen)
+        for ghost_idx in draw_order:
+            if ghost_idx in paths:
+                color = GHOST_PATH_COLORS[ghost_idx % len(GHOST_PATH_COLORS)]
+                pygame.draw.lines(screen, color, False, paths[ghost_idx], 3)
+            if ghost_idx in visible:
+                ghosts[ghost_idx].draw(self.origin, screen)
+        if redraw_hud:
+            pacman.draw_hud(state.tick, state.power_duration, screen)
+            self._hud_key = hud_key
+        profiler.lap("render.blit")
+
+        self._previous = drawn
+        if update:
+            if scrolled:
+                pygame.display.flip()
+            else:
+                pygame.display.update(dirty + drawn)
+            profiler.lap("render.update")
+
+    def draw_overlay(self, lines):
+        # Text in the bottom-left corner, e.g. profiler percentiles. The
+        # area is restored from the background on the next draw.
+        if not lines:
+            return
+        height = self.font.get_linesize()
+        rects = []
+        for k, line in enumerate(lines):
+            text = self.font.render(line, True, WHITE, BLACK)
+            rect = text.get_rect(
+                bottomleft=(5, SCREEN_HEIGHT - 5 - (len(lines) - 1 - k) * height))
+            self.screen.blit(text, rect)
+            rects.append(rect)
+        self._previous = self._previous + rects
+        pygame.display.update(rects)
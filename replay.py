@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import json
+import struct
+import sys
+import time
+import zlib
+from collections import namedtuple
+
+from game import GameState
+from profiler import NULL_PROFILER, Profiler
+
+# File layout (little-endian):
+#   header   magic, version, seed, options length, tick count, checkpoint
+#            interval, checkpoint count
+#   options  GameState keyword arguments as UTF-8 JSON
+#   hashes   8-byte state hash after every interval ticks, then one more
+#            for the final state
+#   inputs   one input code per tick (see INPUTS), zlib-compressed
+MAGIC = b"PACREC\x00\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHqIIHI")
+HASH_SIZE = 8
+CHECKPOINT_INTERVAL = 50
+# Input codes, indexed by code
+INPUTS = [(0, 0), (0, -1), (0, 1), (-1, 0), (1, 0)]
+_CODES = {move: code for code, move in enumerate(INPUTS)}
+
+Recording = namedtuple(
+    "Recording", ["seed", "options", "inputs", "interval", "hashes"])
+
+
+class ReplayMismatch(Exception):
+    def __init__(self, tick, expected, actual):
+        super().__init__(
+            f"state differs at tick {tick}: recorded {expected.hex()}, "
+            f"replayed {actual.hex()}")
+        self.tick = tick
+
+
+def state_hash(state):
+    # Everything the rules depend on: the tick, Pac-Man, every ghost and
+    # the remaining pellets
+    pacman = state.pacman
+    h = hashlib.blake2b(digest_size=HASH_SIZE)
+    h.update(state.status.encode())
+    h.update(struct.pack("<Iqqqq?q", state.tick, pacman.x, pacman.y,
+                         pacman.score, pacman.lives, pacman.powered_up,
+                         pacman.power_time))
+    for ghost in state.ghosts:
+        prev = ghost.prev_pos or (-1, -1)
+        h.update(struct.pack("<qqqq???", ghost.x, ghost.y, *prev,
+                             ghost.is_scared, ghost.ate_during_power,
+                             ghost.just_respawned))
+    h.update(state.maze.pellets.bits)
+    h.update(state.maze.power_pellets.bits)
+    return h.digest()
+
+
+class Recorder:
+    # Plays a seeded GameState and records its inputs. options must be
+    # JSON-serializable GameState keyword arguments; together with the
+    # seed they rebuild the same maze, pellets and ghosts on replay. The
+    # profiler is not part of the recording.
+    def __init__(self, seed, interval=CHECKPOINT_INTERVAL,
+                 profiler=NULL_PROFILER, **options):
+        self.seed = seed
+        self.options = options
+        self.interval = interval
+        self.state = GameState(seed=seed, profiler=profiler, **options)
+        self.inputs = bytearray()
+        self.hashes = []
+
+    def step(self, dx=0, dy=0):
+        events = self.state.step(dx, dy)
+        self.inputs.append(_CODES[(dx, dy)])
+        if len(self.inputs) % self.interval == 0:
+            self.hashes.append(state_hash(self.state))
+        return events
+
+    def recording(self):
+        return Recording(self.seed, self.options, bytes(self.inputs),
+                         self.interval,
+                         self.hashes + [state_hash(self.state)])
+
+    def save(self, path):
+        save(self.recording(), path)
+
+
+def save(recording, path):
+    options = json.dumps(recording.options, sort_keys=True).encode()
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, recording.seed, len(options),
+                            len(recording.inputs), recording.interval,
+                            len(recording.hashes)))
+        f.write(options)
+        f.write(b"".join(recording.hashes))
+        f.write(zlib.compress(recording.inputs, 9))
+
+
+def load(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, seed, options_len, ticks, interval, count = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a game recording")
+    if version != VERSION:
+        raise ValueError(f"unsupported recording version {version}")
+    pos = HEADER.size
+    options = json.loads(data[pos:pos + options_len])
+    pos += options_len
+    hashes = [data[i:i + HASH_SIZE]
+              for i in range(pos, pos + count * HASH_SIZE, HASH_SIZE)]
+    inputs = zlib.decompress(data[pos + count * HASH_SIZE:])
+    if len(inputs) != ticks:
+        raise ValueError(f"{path} is truncated")
+    return Recording(seed, options, inputs, interval, hashes)
+
+
+def new_game(recording, profiler=NULL_PROFILER):
+    return GameState(seed=recording.seed, profiler=profiler,
+                     **recording.options)
+
+
+def replay(recording, verify=True, state=None):
+    # Feeds the recorded inputs to a fresh game (or state, from new_game),
+    # headless. With verify, every checkpoint hash is compared and the
+    # first difference raises ReplayMismatch.
+    if state is None:
+        state = new_game(recording)
+    interval = recording.interval
+    hashes = recording.hashes
+    step = state.step
+    for tick, code in enumerate(recording.inputs, 1):
+        step(*INPUTS[code])
+        if verify and tick % interval == 0:
+            actual = state_hash(state)
+            expected = hashes[tick // interval - 1]
+            if actual != expected:
+                raise ReplayMismatch(tick, expected, actual)
+    if verify:
+        actual = state_hash(state)
+        if actual != hashes[-1]:
+            raise ReplayMismatch(len(recording.inputs), hashes[-1], actual)
+    return state
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded games headless and check their states")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--no-verify", action="store_true")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-phase percentiles for each replay")
+    args = parser.parse_args()
+    failed = 0
+    for path in args.recordings:
+        recording = load(path)
+        profiler = Profiler(enabled=args.profile)
+        start = time.perf_counter()
+        state = new_game(recording, profiler)
+        setup = time.perf_counter() - start
+        try:
+            replay(recording, verify=not args.no_verify, state=state)
+        except ReplayMismatch as e:
+            print(f"{path}: MISMATCH, {e}")
+            failed += 1
+            continue
+        elapsed = time.perf_counter() - start - setup
+        ticks = len(recording.inputs)
+        print(f"{path}: setup {setup:.3f}s, {ticks} ticks in {elapsed:.3f}s "
+              f"({ticks / max(elapsed, 1e-9):.0f} ticks/s), {state.status}, "
+              f"score {state.pacman.score}, hash {state_hash(state).hex()}")
+        for line in profiler.report():
+            print(f"  {line}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
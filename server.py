@@ -0,0 +1,441 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game import GameState, TickClock
+from library import MazeLibrary, pack_bits
+from prefetch import produce_maze
+from profiler import Profiler
+from replay import INPUTS
+from utils import FPS, MAX_TICKS_PER_FRAME, ROWS, COLS
+
+# Protocol, over one TCP connection per game:
+#   client  one JSON line {"seed": int, ...SESSION_OPTIONS}, then one byte
+#           per input change: a replay.INPUTS code, held until the next
+#   server  frames of FRAME (kind, payload length) + payload. The first is
+#           INIT, a JSON description of the board; then a DELTA after each
+#           tick that changed something. The connection is closed after
+#           the DELTA that ends the game.
+# A DELTA is DELTA, then moved actors as MOVE (0 = Pac-Man, 1-4 = ghosts,
+# new cell) and eaten pellet cells as EATEN. Cells are y * cols + x; the
+# timestamp is time.monotonic() on the server when the tick ran, which
+# clients on the same host can compare with their own clock.
+INIT, DELTA_FRAME = 1, 2
+FRAME = struct.Struct("<BI")
+DELTA = struct.Struct("<IdqBBBBH")
+MOVE = struct.Struct("<BI")
+EATEN = struct.Struct("<I")
+STATUSES = ("playing", "won", "game_over")
+SESSION_OPTIONS = ("distance_table", "shared_pursuit", "spawn_distance",
+                   "incremental_ghosts", "power_duration", "ghost_interval")
+FLAG_OPTIONS = ("distance_table", "shared_pursuit", "incremental_ghosts")
+POSITIVE_OPTIONS = ("power_duration", "ghost_interval")
+HELLO_TIMEOUT = 5.0
+# A client is skipped while more than HIGH_WATER bytes wait in its socket
+# buffer, and dropped once it has been skipped for MAX_BEHIND ticks
+HIGH_WATER = 64 * 1024
+MAX_BEHIND = 5 * FPS
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def parse_hello(line):
+    # The seed and GameState options of a hello line; raises ValueError
+    # for anything the game cannot be built from
+    hello = json.loads(line or b"{}")
+    if not isinstance(hello, dict):
+        raise ValueError("the hello must be a JSON object")
+    seed = hello.get("seed")
+    if seed is not None and not _is_int(seed):
+        raise ValueError("seed must be an integer")
+    options = {k: hello[k] for k in SESSION_OPTIONS if k in hello}
+    for key, value in options.items():
+        if key in FLAG_OPTIONS:
+            ok = isinstance(value, bool)
+        elif key in POSITIVE_OPTIONS:
+            ok = _is_int(value) and value > 0
+        else:
+            ok = _is_int(value) and value >= 0
+        if not ok:
+            raise ValueError(f"invalid {key}: {value!r}")
+    return seed, options
+
+
+class _Generated:
+    # The producer interface Maze expects, for one maze built in the pool
+    def __init__(self, grid, distances):
+        self.rows = grid.rows
+        self.cols = grid.cols
+        self._maze = (grid, distances)
+
+    def take(self):
+        return self._maze
+
+
+class Session:
+    # One game and its client. Only what changed since the last frame the
+    # client was sent goes out, so frames skipped for a slow client are
+    # folded into the next one.
+    def __init__(self, state, writer):
+        self.state = state
+        self.writer = writer
+        self.move = (0, 0)
+        self.open = True
+        self.behind = 0
+        self.eaten = []
+        self.sent = self._actors()
+        self.sent_head = None
+
+    def _actors(self):
+        cols = self.state.maze.cols
+        cells = [self.state.pacman.y * cols + self.state.pacman.x]
+        cells.extend(g.y * cols + g.x for g in self.state.ghosts)
+        return cells
+
+    def init_frame(self):
+        state = self.state
+        maze = state.maze
+        board = {
+            "rows": maze.rows,
+            "cols": maze.cols,
+            "walls": pack_bits(maze.grid.cells).hex(),
+            "pellets": pack_bits(maze.pellets.bits).hex(),
+            "power_pellets": pack_bits(maze.power_pellets.bits).hex(),
+            "actors": self.sent,
+            "ghosts": [g.name for g in state.ghosts],
+            "tick": state.tick,
+        }
+        payload = json.dumps(board).encode()
+        return FRAME.pack(INIT, len(payload)) + payload
+
+    def input(self, code):
+        if code < len(INPUTS):
+            self.move = INPUTS[code]
+
+    def step(self):
+        cols = self.state.maze.cols
+        for kind, detail in self.state.step(*self.move):
+            if kind in ("pellet", "power"):
+                x, y = detail
+                self.eaten.append(y * cols + x)
+
+    def delta_frame(self, now):
+        state = self.state
+        pacman = state.pacman
+        flags = pacman.powered_up
+        for k, ghost in enumerate(state.ghosts):
+            flags |= ghost.is_scared << (k + 1)
+        head = (pacman.score, pacman.lives, STATUSES.index(state.status),
+                flags)
+        actors = self._actors()
+        moved = [(i, cell) for i, (cell, old) in
+                 enumerate(zip(actors, self.sent)) if cell != old]
+        if not moved and not self.eaten and head == self.sent_head:
+            return None
+        parts = [DELTA.pack(state.tick, now, *head, len(moved),
+                            len(self.eaten))]
+        parts.extend(MOVE.pack(i, cell) for i, cell in moved)
+        parts.extend(EATEN.pack(cell) for cell in self.eaten)
+        payload = b"".join(parts)
+        self.sent = actors
+        self.sent_head = head
+        self.eaten = []
+        return FRAME.pack(DELTA_FRAME, len(payload)) + payload
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self.writer.close()
+
+
+class GameServer:
+    # Runs every session's game on one shared fixed-timestep scheduler in
+    # one asyncio loop: each tick steps all games, then writes each
+    # client's delta. Nothing here touches pygame, so no session can block
+    # the others on a window or a wait loop. New mazes come from the maze
+    # library when one is given, otherwise from a process pool so that
+    # generating one does not stall the tick.
+    def __init__(self, rate=FPS, library=None, workers=None, engine="python",
+                 high_water=HIGH_WATER, max_behind=MAX_BEHIND,
+                 profiler=None):
+        self.rate = rate
+        self.library = library
+        self.workers = workers
+        self.engine = engine
+        self.high_water = high_water
+        self.max_behind = max_behind
+        self.profiler = profiler or Profiler()
+        self.sessions = set()
+        self.pool = None
+        self.ticks = 0
+        self.busy = 0.0
+        self.dropped = 0
+        self.failed = 0
+        self.rejected = 0
+        self.finished = 0
+        self.clock = TickClock(rate, MAX_TICKS_PER_FRAME)
+
+    async def _new_game(self, seed, options):
+        if self.library is not None:
+            return GameState(seed=seed, library=self.library, **options)
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        grid, distances, _ = await asyncio.get_running_loop().run_in_executor(
+            self.pool, produce_maze, seed, ROWS, COLS,
+            options.get("distance_table", False), {"engine": self.engine})
+        return GameState(seed=seed, producer=_Generated(grid, distances),
+                         **options)
+
+    async def handle(self, reader, writer):
+        try:
+            line = await asyncio.wait_for(reader.readline(), HELLO_TIMEOUT)
+            seed, options = parse_hello(line)
+            state = await self._new_game(seed, options)
+        except Exception:
+            # Bad hello, lost client or a game that could not be built
+            self.rejected += 1
+            writer.close()
+            return
+        session = Session(state, writer)
+        writer.write(session.init_frame())
+        self.sessions.add(session)
+        try:
+            while session.open:
+                data = await reader.read(256)
+                if not data:
+                    break
+                session.input(data[-1])
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(session)
+            session.close()
+
+    def tick(self):
+        start = time.process_time()
+        now = time.monotonic()
+        with self.profiler.phase("server.tick"):
+            for session in list(self.sessions):
+                transport = session.writer.transport
+                try:
+                    session.step()
+                except Exception:
+                    self._fail(session)
+                    continue
+                if transport.get_write_buffer_size() > self.high_water:
+                    # Slow client: fold this tick into the next frame
+                    session.behind += 1
+                    if session.behind > self.max_behind:
+                        self.dropped += 1
+                        self.sessions.discard(session)
+                        transport.abort()
+                        session.open = False
+                    continue
+                session.behind = 0
+                try:
+                    frame = session.delta_frame(now)
+                except Exception:
+                    self._fail(session)
+                    continue
+                if frame is not None:
+                    session.writer.write(frame)
+                if session.state.done:
+                    self.finished += 1
+                    self.sessions.discard(session)
+                    session.close()
+        self.ticks += 1
+        self.busy += time.process_time() - start
+
+    def _fail(self, session):
+        # A session whose game raised is dropped so the others keep going
+        self.failed += 1
+        self.sessions.discard(session)
+        session.writer.transport.abort()
+        session.open = False
+
+    async def run(self):
+        clock = self.clock
+        clock.reset()
+        while True:
+            for _ in range(clock.due()):
+                self.tick()
+            await asyncio.sleep(max(0.0, clock.interval - clock.accumulator))
+
+    async def report(self, every):
+        # Tick time percentiles (wall clock) and the CPU time share of one
+        # core the ticks use; sessions / load estimates how many sessions
+        # one core can carry
+        while True:
+            ticks, busy = self.ticks, self.busy
+            await asyncio.sleep(every)
+            load = (self.busy - busy) / every
+            capacity = len(self.sessions) / load if load else 0
+            line = (f"{len(self.sessions)} sessions, "
+                    f"{(self.ticks - ticks) / every:.1f} ticks/s, "
+                    f"load {load:.0%} of a core (~{capacity:,.0f} sessions "
+                    f"per core), {self.finished} finished, {self.dropped} "
+                    f"dropped, {self.failed} failed, {self.rejected} "
+                    f"rejected, {self.clock.dropped} ticks skipped")
+            stats = {s.phase: s for s in self.profiler.stats()}
+            tick = stats.get("server.tick")
+            if tick is not None:
+                line += (f"; tick p50 {tick.p50_ms:.2f} p95 "
+                         f"{tick.p95_ms:.2f} p99 {tick.p99_ms:.2f} ms")
+            print(line, flush=True)
+
+    async def serve(self, host, port, every=5.0):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"serving on {host}:{port} at {self.rate} ticks/s", flush=True)
+        async with server:
+            tasks = [asyncio.create_task(self.run())]
+            if every:
+                tasks.append(asyncio.create_task(self.report(every)))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                if self.pool is not None:
+                    self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def read_frame(reader):
+    kind, size = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(size)
+
+
+async def play_session(host, port, hello, deadline, rng, latencies,
+                       counts, stalled=False):
+    # One load-test client: plays random moves until its game ends or the
+    # deadline passes, recording the latency of every DELTA
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(json.dumps(hello).encode() + b"\n")
+        kind, _ = await read_frame(reader)
+        counts["sessions"] += 1
+        if stalled:
+            # Never reads again, so the server has to hold it back
+            await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+            return
+        while time.monotonic() < deadline:
+            kind, payload = await read_frame(reader)
+            tick, sent, score, lives, status, *_ = DELTA.unpack_from(payload)
+            latencies.append(time.monotonic() - sent)
+            counts["frames"] += 1
+            counts["bytes"] += FRAME.size + len(payload)
+            if status:
+                counts["games"] += 1
+                return
+            if rng.random() < 0.2:
+                writer.write(bytes([rng.randrange(1, len(INPUTS))]))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        counts["disconnects"] += 1
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, sessions, duration, seed, stalled, options):
+    deadline = time.monotonic() + duration
+    rng = random.Random(seed)
+    latencies = []
+    counts = dict.fromkeys(
+        ["sessions", "frames", "bytes", "games", "disconnects"], 0)
+
+    async def client(i):
+        n = 0
+        while time.monotonic() < deadline:
+            hello = dict(options, seed=seed + i * 100003 + n)
+            await play_session(host, port, hello, deadline, rng, latencies,
+                               counts, i < stalled)
+            n += 1
+
+    await asyncio.gather(*(client(i) for i in range(sessions)))
+    return latencies, counts
+
+
+def run_load(args):
+    # One load-test process
+    return asyncio.run(load_test(*args))
+
+
+def load_main(args):
+    share = [args.sessions // args.processes
+             + (i < args.sessions % args.processes)
+             for i in range(args.processes)]
+    options = {"distance_table": args.distance_table}
+    jobs = [(args.host, args.port, n, args.duration, args.seed + i * 10 ** 7,
+             args.stalled if i == 0 else 0, options)
+            for i, n in enumerate(share)]
+    with multiprocessing.Pool(args.processes) as pool:
+        results = pool.map(run_load, jobs)
+    latencies = sorted(x for result, _ in results for x in result)
+    counts = {}
+    for _, result in results:
+        for key, value in result.items():
+            counts[key] = counts.get(key, 0) + value
+    n = len(latencies)
+
+    def ms(p):
+        return latencies[min(n - 1, p * n // 100)] * 1000 if n else 0.0
+    print(f"{args.sessions} clients for {args.duration:.0f}s: "
+          f"{counts['sessions']} sessions, {counts['games']} games finished, "
+          f"{counts['disconnects']} disconnected")
+    print(f"{counts['frames'] / args.duration:,.0f} frames/s, "
+          f"{counts['bytes'] / max(counts['frames'], 1):.1f} bytes/frame, "
+          f"tick latency p50 {ms(50):.2f} p95 {ms(95):.2f} "
+          f"p99 {ms(99):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve many games over TCP, or load-test a server")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="run the game server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--rate", type=float, default=FPS,
+                       help="ticks per second for every session")
+    serve.add_argument("--library", default=None,
+                       help="take mazes from this library file")
+    serve.add_argument("--workers", type=int, default=None,
+                       help="maze generation processes without a library")
+    serve.add_argument("--engine", default="python")
+    serve.add_argument("--high-water", type=int, default=HIGH_WATER,
+                       help="bytes queued for a client before it is skipped")
+    serve.add_argument("--stats", type=float, default=5.0,
+                       help="seconds between stats lines; 0 = off")
+
+    load = sub.add_parser("load", help="connect many playing clients")
+    load.add_argument("--host", default="127.0.0.1")
+    load.add_argument("--port", type=int, default=8765)
+    load.add_argument("--sessions", type=int, default=100)
+    load.add_argument("--duration", type=float, default=20.0)
+    load.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    load.add_argument("--stalled", type=int, default=0,
+                      help="clients that stop reading after the board")
+    load.add_argument("--distance-table", action="store_true",
+                      help="ask for games with the precomputed ghost table")
+    load.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        library = MazeLibrary(args.library) if args.library else None
+        server = GameServer(args.rate, library, args.workers, args.engine,
+                            args.high_water)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.stats))
+        except KeyboardInterrupt:
+            pass
+    else:
+        load_main(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from grid import Grid
+from pathfinding import GridSearch, IncrementalPlanner
+
+
+def random_grid(rows, cols, seed, walls=0.3):
+    rng = random.Random(seed)
+    return Grid.from_rows(
+        [[1 if x in (0, cols - 1) or y in (0, rows - 1)
+          or rng.random() < walls else 0 for x in range(cols)]
+         for y in range(rows)])
+
+
+def assert_shortest(grid, path, start, goal, expected):
+    assert len(path) == len(expected)
+    if expected:
+        assert path[-1] == goal
+    for (ax, ay), (bx, by) in zip([start] + path, path):
+        assert abs(ax - bx) + abs(ay - by) == 1
+        assert grid.is_open(bx, by)
+
+
+@pytest.mark.parametrize("heuristic", [True, False])
+def test_corridor_target_past_previous_goal(heuristic):
+    grid = Grid.from_rows([[1] * 9, [1] + [0] * 7 + [1], [1] * 9])
+    planner = IncrementalPlanner(3, 9, heuristic)
+    assert planner.path(grid, 1, 1, 4, 1) == [(2, 1), (3, 1), (4, 1)]
+    assert planner.path(grid, 1, 1, 5, 1) == [(2, 1), (3, 1), (4, 1), (5, 1)]
+
+
+@pytest.mark.parametrize("heuristic", [True, False])
+@pytest.mark.parametrize("seed", range(4))
+def test_chained_queries_match_grid_search(heuristic, seed):
+    rows, cols = 15, 17
+    grid = random_grid(rows, cols, seed)
+    search = GridSearch(rows, cols)
+    cells = [(x, y) for y in range(rows) for x in range(cols)
+             if grid.is_open(x, y)]
+    rng = random.Random(seed)
+    for _ in range(10):
+        planner = IncrementalPlanner(rows, cols, heuristic)
+        start = rng.choice(cells)
+        for _ in range(30):
+            goal = rng.choice(cells)
+            expected = search.a_star(grid, *start, *goal)
+            path = planner.path(grid, *start, *goal)
+            assert_shortest(grid, path, start, goal, expected)
+
+
+@pytest.mark.parametrize("heuristic", [True, False])
+def test_ghost_following_its_path(heuristic):
+    rows, cols = 15, 17
+    grid = random_grid(rows, cols, 7, walls=0.2)
+    search = GridSearch(rows, cols)
+    cells = [(x, y) for y in range(rows) for x in range(cols)
+             if grid.is_open(x, y)]
+    rng = random.Random(7)
+    planner = IncrementalPlanner(rows, cols, heuristic)
+    ghost = rng.choice(cells)
+    target = rng.choice(cells)
+    for _ in range(300):
+        for _ in range(rng.choice([0, 1, 3])):
+            tx, ty = target
+            moves = [(tx + dx, ty + dy)
+                     for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]
+                     if grid.is_open(tx + dx, ty + dy)]
+            if moves:
+                target = rng.choice(moves)
+        expected = search.a_star(grid, *ghost, *target)
+        path = planner.path(grid, *ghost, *target)
+        assert_shortest(grid, path, ghost, target, expected)
+        if path:
+            ghost = path[0]
+        if ghost == target or not path:
+            ghost = rng.choice(cells)
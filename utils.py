@@ -1,12 +1,20 @@
-import pygame
 import os
 
 SCREEN_WIDTH = 720
 SCREEN_HEIGHT = 720
 TILE_SIZE = 30
-ROWS = SCREEN_HEIGHT // TILE_SIZE
-COLS = SCREEN_WIDTH // TILE_SIZE
-FPS = 10
+# Tiles visible at once; boards larger than this scroll
+VIEW_ROWS = SCREEN_HEIGHT // TILE_SIZE
+VIEW_COLS = SCREEN_WIDTH // TILE_SIZE
+# Default board size
+ROWS = VIEW_ROWS
+COLS = VIEW_COLS
+FPS = 10  # simulation ticks per second
+POWER_DURATION = 10 * FPS  # ticks
+GHOST_MOVE_INTERVAL = 3  # ticks between ghost moves
+RENDER_FPS = 60  # upper bound on window redraws per second
+MAX_TICKS_PER_FRAME = 5  # catch-up ticks per frame before the game slows
+DEATH_PAUSE = FPS  # ticks the board holds still after a lost life
 
 BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
@@ -17,33 +25,115 @@ ORANGE = (255, 165, 0)
 YELLOW = (255, 255, 0)
 CYAN = (0, 255, 255)
 
-pygame.init()
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Pac-Man with AI")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont('Arial', 25)
-
-
-def load_and_scale(image_path):
-    image = pygame.image.load(image_path).convert_alpha()
-    scaled_image = pygame.transform.scale(image, (TILE_SIZE, TILE_SIZE))
-    return scaled_image
-
-
-SPRITES = {
-    "pacman": load_and_scale(os.path.join("pacman-art", "pacman-right", "1.png")),
-    "blinky": load_and_scale(os.path.join("pacman-art", "ghosts", "blinky.png")),
-    "inky": load_and_scale(os.path.join("pacman-art", "ghosts", "inky.png")),
-    "pinky": load_and_scale(os.path.join("pacman-art", "ghosts", "pinky.png")),
-    "clyde": load_and_scale(os.path.join("pacman-art", "ghosts", "clyde.png")),
-    "scared": load_and_scale(os.path.join("pacman-art", "ghosts", "blue_ghost.png")),
-    "pellet": load_and_scale(os.path.join("pacman-art", "other", "dot.png")),
-    "power_pellet": load_and_scale(os.path.join("pacman-art", "other", "powerup.png")),
-    "wall": load_and_scale(os.path.join("pacman-art", "other", "wall.png")),
+DISPLAY_ATTRIBUTES = ("screen", "clock", "font", "SPRITES")
+_display = {}
+
+ART_DIR = "pacman-art"
+SPRITE_FILES = {
+    "pacman": os.path.join("pacman-right", "1.png"),
+    "blinky": os.path.join("ghosts", "blinky.png"),
+    "inky": os.path.join("ghosts", "inky.png"),
+    "pinky": os.path.join("ghosts", "pinky.png"),
+    "clyde": os.path.join("ghosts", "clyde.png"),
+    "scared": os.path.join("ghosts", "blue_ghost.png"),
+    "pellet": os.path.join("other", "dot.png"),
+    "power_pellet": os.path.join("other", "powerup.png"),
+    "wall": os.path.join("other", "wall.png"),
 }
+# Pre-scaled sprite atlases, one raw RGBA file per TILE_SIZE
+ATLAS_DIR = os.path.join(ART_DIR, ".cache")
+
+
+def load_atlas(tile_size=TILE_SIZE):
+    # All sprites side by side in one surface, scaled to tile_size. The
+    # scaled pixels are cached in ATLAS_DIR and read back in one go while
+    # the cache is newer than every source image; a cache that cannot be
+    # written is simply rebuilt next time.
+    import pygame
+    size = (tile_size * len(SPRITE_FILES), tile_size)
+    path = os.path.join(ATLAS_DIR, f"atlas-{tile_size}.rgba")
+    sources = [os.path.join(ART_DIR, name) for name in SPRITE_FILES.values()]
+    try:
+        cached = os.path.getmtime(path)
+        fresh = all(os.path.getmtime(src) <= cached for src in sources)
+    except OSError:
+        fresh = False
+    if fresh:
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) == size[0] * size[1] * 4:
+            return pygame.image.frombytes(data, size, "RGBA")
+    atlas = pygame.Surface(size, pygame.SRCALPHA)
+    for k, src in enumerate(sources):
+        image = pygame.image.load(src)
+        atlas.blit(pygame.transform.scale(image, (tile_size, tile_size)),
+                   (k * tile_size, 0))
+    try:
+        os.makedirs(ATLAS_DIR, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(pygame.image.tobytes(atlas, "RGBA"))
+    except OSError:
+        pass
+    return atlas
+
+
+def load_sprites(tile_size=TILE_SIZE):
+    # Sprites as views into one converted atlas surface
+    import pygame
+    atlas = load_atlas(tile_size).convert_alpha()
+    return {name: atlas.subsurface(
+                pygame.Rect(k * tile_size, 0, tile_size, tile_size))
+            for k, name in enumerate(SPRITE_FILES)}
+
+
+def init_display():
+    # The window, font and sprites are only created once a frontend asks
+    # for them, so the game logic can be imported and run headless.
+    if _display:
+        return
+    import pygame
+    # Only the display and font modules; the game has no sound
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Pac-Man with AI")
+    _display.update(
+        screen=screen,
+        clock=pygame.time.Clock(),
+        font=pygame.font.SysFont('Arial', 25),
+        SPRITES=load_sprites(),
+    )
+
+
+def __getattr__(name):
+    if name in DISPLAY_ATTRIBUTES:
+        init_display()
+        return _display[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def show_loading_screen(message="Generating Maze..."):
+    import pygame
+    init_display()
+    screen = _display["screen"]
+    font = _display["font"]
+    screen.fill(BLACK)
+    loading_text = font.render(message, True, WHITE)
+    screen.blit(
+        loading_text,
+        (
+            SCREEN_WIDTH // 2 - loading_text.get_width() // 2,
+            SCREEN_HEIGHT // 2 - loading_text.get_height() // 2
+        )
+    )
+    pygame.display.flip()
 
 
 def game_over_screen(score, won=False):
+    import pygame
+    init_display()
+    screen = _display["screen"]
+    font = _display["font"]
     screen.fill(BLACK)
     if won:
         message = f"You Won! Score: {score}"
@@ -78,6 +168,10 @@ def game_over_screen(score, won=False):
 
 
 def show_error_screen(error_message):
+    import pygame
+    init_display()
+    screen = _display["screen"]
+    font = _display["font"]
     screen.fill(BLACK)
     error_text = font.render(f"Error: {str(error_message)}", True, RED)
     retry_text = font.render("Press R to restart or Q to quit", True, WHITE)
@@ -0,0 +1,298 @@
+from collections import namedtuple
+
+import numpy as np
+
+from ghost import GHOST_CONFIGS, SHORTEST_PATH_ALGORITHMS, Ghost
+from maze import DistanceTable, Maze, MAX_TABLE_CELLS
+from pacman import PacMan
+from replay import INPUTS
+from utils import POWER_DURATION, GHOST_MOVE_INTERVAL
+
+STATUSES = ("playing", "won", "game_over")
+PLAYING, WON, GAME_OVER = range(len(STATUSES))
+# Ghost neighbours in the order the ghosts try them
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+Observation = namedtuple(
+    "Observation", ["pacman", "ghosts", "pellets", "power_pellets",
+                    "powered", "scared", "lives", "status"])
+
+
+class VecGameState:
+    # n games on one maze, stepped in lockstep with the rules of
+    # GameState.step, PacMan.move/handle_collisions and the ghosts' moves,
+    # but with every game's state held in NumPy arrays (one row per game)
+    # instead of per-actor objects. Cells are flat indices y * cols + x.
+    # Actions are the replay.INPUTS codes: 0 stays, 1-4 are up, down, left
+    # and right.
+    #
+    # The shortest-path ghosts walk the maze's distance table, as they do
+    # in GameState with distance_table=True, so the maze must have at most
+    # MAX_TABLE_CELLS open cells. Ghosts that have no path move at random
+    # like Ghost.simple_random_move, but from this object's generator, so
+    # those moves differ from a GameState with the same seed.
+    def __init__(self, n, maze=None, seed=None, power_duration=POWER_DURATION,
+                 ghost_interval=GHOST_MOVE_INTERVAL, **maze_options):
+        if maze is None:
+            maze = Maze(seed=seed, **maze_options)
+        grid = maze.grid
+        if grid.count_open() > MAX_TABLE_CELLS:
+            raise ValueError(
+                f"vectorized games need at most {MAX_TABLE_CELLS} open cells")
+        self.n = n
+        self.maze = maze
+        self.rng = np.random.default_rng(seed)
+        self.power_duration = power_duration
+        self.ghost_interval = ghost_interval
+        rows = self.rows = maze.rows
+        cols = self.cols = maze.cols
+        size = rows * cols
+        cells = np.arange(size)
+        self.xs = cells % cols
+        self.ys = cells // cols
+        self.open = np.frombuffer(bytes(grid.cells), dtype=np.uint8) == 0
+        neighbors = np.full((size, len(DIRECTIONS)), -1, dtype=np.int64)
+        for d, (dx, dy) in enumerate(DIRECTIONS):
+            x = self.xs + dx
+            y = self.ys + dy
+            inside = (x >= 0) & (x < cols) & (y >= 0) & (y < rows)
+            target = np.where(inside, y * cols + x, 0)
+            ok = inside & self.open[target]
+            neighbors[ok, d] = target[ok]
+        self.neighbors = neighbors
+        table = maze.distances
+        if table is None:
+            table = DistanceTable(grid)
+        self.table_size = table.size
+        self.unreachable = table.UNREACHABLE
+        self.index = np.frombuffer(table.index, dtype=np.int32).astype(np.int64)
+        self.dist = np.frombuffer(table.dist, dtype=np.uint16)
+        self.next_hop = np.frombuffer(table.next_hop, dtype=np.uint16)
+        self.table_cells = np.array([y * cols + x for x, y in table.cells],
+                                    dtype=np.int64)
+        self.chasers = np.array([alg in SHORTEST_PATH_ALGORITHMS
+                                 for alg, _ in GHOST_CONFIGS])
+        self.greedy = np.array([alg == "Greedy" for alg, _ in GHOST_CONFIGS])
+        self.spawnable = np.array([y * cols + x for x, y in
+                                   Ghost.spawn_cells(maze)], dtype=np.int64)
+        self.initial_pellets = np.frombuffer(bytes(maze.pellets.bits),
+                                             dtype=np.uint8).astype(bool)
+        self.initial_power = np.frombuffer(bytes(maze.power_pellets.bits),
+                                           dtype=np.uint8).astype(bool)
+        pacman = PacMan()
+        self.start = pacman.y * cols + pacman.x
+        self.start_lives = pacman.lives
+        ghosts = len(GHOST_CONFIGS)
+        self.pacman = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.powered = np.zeros(n, dtype=bool)
+        self.power_time = np.zeros(n, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.status = np.zeros(n, dtype=np.int8)
+        self.pellets = np.zeros((n, size), dtype=bool)
+        self.power_pellets = np.zeros((n, size), dtype=bool)
+        self.remaining = np.zeros(n, dtype=np.int64)
+        self.ghosts = np.zeros((n, ghosts), dtype=np.int64)
+        self.ghost_start = np.zeros((n, ghosts), dtype=np.int64)
+        self.prev = np.zeros((n, ghosts), dtype=np.int64)
+        self.scared = np.zeros((n, ghosts), dtype=bool)
+        self.ate = np.zeros((n, ghosts), dtype=bool)
+        self.respawned = np.zeros((n, ghosts), dtype=bool)
+        action_dx, action_dy = zip(*INPUTS)
+        self.action_dx = np.array(action_dx, dtype=np.int64)
+        self.action_dy = np.array(action_dy, dtype=np.int64)
+        self.reset()
+
+    def reset(self, games=None):
+        # Starts new games in the given rows (a boolean mask or indices;
+        # all by default) with fresh pellets and ghost spawns
+        if games is None:
+            games = np.arange(self.n)
+        elif np.asarray(games).dtype == bool:
+            games = np.flatnonzero(games)
+        count = len(games)
+        self.pacman[games] = self.start
+        self.score[games] = 0
+        self.lives[games] = self.start_lives
+        self.powered[games] = False
+        self.power_time[games] = 0
+        self.tick[games] = 0
+        self.status[games] = PLAYING
+        self.pellets[games] = self.initial_pellets
+        self.power_pellets[games] = self.initial_power
+        self.remaining[games] = (self.initial_pellets.sum()
+                                 + self.initial_power.sum())
+        spawns = self.spawnable[self.rng.integers(
+            len(self.spawnable), size=(count, len(GHOST_CONFIGS)))]
+        self.ghosts[games] = spawns
+        self.ghost_start[games] = spawns
+        self.prev[games] = -1
+        self.scared[games] = False
+        self.ate[games] = False
+        self.respawned[games] = False
+        return self.observation()
+
+    def observation(self):
+        # Views of the live arrays; the next step or reset overwrites them
+        return Observation(self.pacman, self.ghosts, self.pellets,
+                           self.power_pellets, self.powered, self.scared,
+                           self.lives, self.status)
+
+    @property
+    def done(self):
+        return self.status != PLAYING
+
+    def step(self, actions):
+        # Advances every game that is still playing by one tick. Returns
+        # the observation, the points each game scored and which games
+        # are over; finished games stay as they are until reset.
+        actions = np.asarray(actions)
+        score_before = self.score.copy()
+        active = self.status == PLAYING
+        dx = self.action_dx[actions]
+        dy = self.action_dy[actions]
+        moving = active & ((dx != 0) | (dy != 0))
+        games = np.flatnonzero(moving)
+        if len(games):
+            alive = self._move_pacman(games, dx[games], dy[games])
+            active[games[~alive]] = False
+
+        games = np.flatnonzero(active)
+        now = self.tick[games]
+        expired = games[self.powered[games]
+                        & (now - self.power_time[games] > self.power_duration)]
+        self.powered[expired] = False
+        self.scared[expired] = False
+        self.ate[expired] = False
+        self.scared[games] = (~self.respawned[games]
+                              & self.powered[games, None] & ~self.ate[games])
+
+        self.tick[games] += 1
+        games = games[self.tick[games] % self.ghost_interval == 0]
+        if len(games):
+            self._move_ghosts(games)
+        return self.observation(), self.score - score_before, self.done
+
+    def _move_pacman(self, games, dx, dy):
+        # PacMan.move and handle_collisions for games with a move; returns
+        # which of them are still being played
+        pos = self.pacman[games]
+        x = self.xs[pos] + dx
+        y = self.ys[pos] + dy
+        inside = (x >= 0) & (x < self.cols) & (y >= 0) & (y < self.rows)
+        target = np.where(inside, y * self.cols + x, 0)
+        moved = inside & self.open[target]
+        pos = np.where(moved, target, pos)
+        self.pacman[games] = pos
+        pellet = moved & self.pellets[games, pos]
+        self.pellets[games[pellet], pos[pellet]] = False
+        power = moved & self.power_pellets[games, pos]
+        self.power_pellets[games[power], pos[power]] = False
+        self.remaining[games] -= pellet.astype(np.int64) + power
+        self.score[games] += 10 * pellet + 50 * power
+        self.powered[games[power]] = True
+        self.power_time[games[power]] = self.tick[games[power]]
+        won = moved & ~power & (self.remaining[games] == 0)
+
+        pending = np.ones(len(games), dtype=bool)
+        for k in range(self.ghosts.shape[1]):
+            at = pending & (self.ghosts[games, k] == self.pacman[games])
+            eat = at & self.scared[games, k] & ~self.ate[games, k]
+            self._respawn(games[eat], k)
+            self.score[games[eat]] += 200
+            caught = at & ~eat
+            pending &= ~caught
+            self._lose_life(games[caught])
+        alive = self.lives[games] > 0
+        self.status[games[~alive]] = GAME_OVER
+        self.status[games[alive & won]] = WON
+        powered = games[alive & power]
+        self.ate[powered] = False
+        self.respawned[powered] = False
+        return alive
+
+    def _respawn(self, games, k):
+        # Ghost.reset_position after Pac-Man eats ghost k
+        self.ghosts[games, k] = self.ghost_start[games, k]
+        self.prev[games, k] = -1
+        self.scared[games, k] = False
+        self.respawned[games, k] = True
+        self.ate[games, k] = True
+
+    def _lose_life(self, games):
+        # PacMan.reset_after_death for the games that still have lives
+        self.lives[games] -= 1
+        games = games[self.lives[games] > 0]
+        self.pacman[games] = self.start
+        self.powered[games] = False
+        self.ghosts[games] = self.ghost_start[games]
+        self.prev[games] = -1
+        self.respawned[games] = False
+        self.ate[games] = False
+        self.scared[games] = False
+
+    def _move_ghosts(self, games):
+        # Ghosts move one after another; a catch ends the ghosts' turn in
+        # that game
+        for k in range(self.ghosts.shape[1]):
+            if not len(games):
+                break
+            self._move_ghost(games, k)
+            caught = ((self.ghosts[games, k] == self.pacman[games])
+                      & (~self.scared[games, k] | self.ate[games, k]))
+            self._lose_life(games[caught])
+            over = games[caught & (self.lives[games] <= 0)]
+            self.status[over] = GAME_OVER
+            games = games[~caught]
+
+    def _move_ghost(self, games, k):
+        cur = self.ghosts[games, k]
+        pac = self.pacman[games]
+        prev = self.prev[games, k]
+        options = self.neighbors[cur]
+        valid = options >= 0
+        # Moves back to the previous cell are only taken when there is no
+        # other way out
+        fresh = valid & (options != prev[:, None])
+        fresh |= valid & ~fresh.any(axis=1, keepdims=True)
+        cells = np.where(valid, options, 0)
+        # (distance, x, y) as one sortable number
+        key = ((np.abs(self.xs[cells] - self.xs[pac][:, None])
+                + np.abs(self.ys[cells] - self.ys[pac][:, None]))
+               * (self.rows * self.cols)
+               + self.xs[cells] * self.rows + self.ys[cells])
+        scared = self.scared[games, k]
+        new = cur.copy()
+        moved = np.zeros(len(games), dtype=bool)
+
+        choice = np.argmax(np.where(fresh, key, -1), axis=1)
+        has = fresh.any(axis=1) & scared
+        new[has] = options[has, choice[has]]
+        moved |= has
+
+        if self.chasers[k]:
+            n = self.table_size
+            slot = self.index[cur] * n + self.index[pac]
+            d = self.dist[slot]
+            has = ~scared & (d != 0) & (d != self.unreachable)
+            new[has] = self.table_cells[self.next_hop[slot[has]]]
+        elif self.greedy[k]:
+            choice = np.argmin(np.where(valid, key, np.iinfo(key.dtype).max),
+                               axis=1)
+            has = ~scared & valid.any(axis=1)
+            new[has] = options[has, choice[has]]
+        else:
+            has = np.zeros(len(games), dtype=bool)
+        moved |= has
+
+        lost = ~scared & ~has & fresh.any(axis=1)
+        if lost.any():
+            # Ghost.simple_random_move
+            pick = np.where(fresh[lost], self.rng.random((lost.sum(), 4)), -1)
+            new[lost] = options[lost, np.argmax(pick, axis=1)]
+            moved |= lost
+
+        self.prev[games[moved], k] = cur[moved]
+        self.ghosts[games, k] = new
+        self.respawned[games, k] = False